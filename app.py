@@ -1,28 +1,212 @@
 from __future__ import annotations
 
+import logging
 import os
+import time
+from contextlib import nullcontext
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, render_template, request, redirect, url_for, session, send_file, flash, jsonify
 
 from config import (
     SECRET_KEY,
     APP_PASSWORD,
     TEMPLATE_PDF_PATH,
     DEFAULT_LOGO_PATH,
+    TMP_DIR,
+    JOB_WORKERS,
+    BATCH_WORKERS,
+    BATCH_MAX_FILES,
+    BATCH_MAX_UNCOMPRESSED_BYTES,
+    MATCH_XLSX_PATH,
+    MATCH_MODE,
+    MATCH_MEMO_MAX_ENTRIES,
+    MATCH_MEMO_DB,
+    JOB_TTL_SECONDS,
+    SYNC_BUDGET_SECONDS,
+    PDF_COMPOSE,
+    PDF_ENGINE,
+    PDF_WORKERS,
+    PDF_CHUNK_SIZE,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_MAX_MB,
+    RESULT_CACHE_TTL_SECONDS,
+    PAGE_CACHE_DIR,
+    PAGE_CACHE_MAX_MB,
+    SERVER_TIMING,
+    PROFILING_ENABLED,
+    PROFILE_DIR,
 )
 
-from services.extract_items import extract_items_from_excel_bytes
-from services.pdf_builder import build_pdf_from_template
+from services.assets import AssetRegistry, LogoAsset, TemplateAsset
+from services.batch import BATCH_ZIP_NAME, BatchSettings, iter_zip_workbooks, run_batch
+from services.extract_items import iter_item_rows
+from services.item_table import ItemTable
+from services.jobs import JOB_DONE, JOB_ERROR, Job, JobManager
+from services.match_engine import configure_match_memo, match_cache_stats, match_memo_stats
+from services.page_cache import PageCache
+from services.pdf_builder import pages_for, write_pdf_from_template
+from services.profiling import profile_to, server_timing, span, trace
+from services.result_cache import ResultCache, bytes_digest, result_key
+
 
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.secret_key = SECRET_KEY
 
+# Template PDF + logo default: se parsean una vez al arrancar (y se recargan si cambian en disco)
+ASSETS = AssetRegistry(TEMPLATE_PDF_PATH, DEFAULT_LOGO_PATH)
+ASSETS.preload()
+
+# Generaciones en segundo plano (el PDF queda en TMP_DIR hasta que vence el job)
+JOBS = JobManager(TMP_DIR, max_workers=JOB_WORKERS, ttl_seconds=JOB_TTL_SECONDS)
+
+# PDFs ya generados, por hash de (Excel, logo, fecha, template, engine)
+RESULTS = ResultCache(
+    RESULT_CACHE_DIR,
+    max_bytes=int(RESULT_CACHE_MAX_MB * 1024 * 1024),
+    ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+)
+
+# Páginas ya compuestas: un re-upload con pocas filas cambiadas solo renderiza esas
+PAGES = PageCache(PAGE_CACHE_DIR, max_bytes=int(PAGE_CACHE_MAX_MB * 1024 * 1024))
+
+# Descripción -> fila de match.xlsx ya puntuada (las mismas descripciones se repiten entre presupuestos)
+configure_match_memo(MATCH_MEMO_MAX_ENTRIES, MATCH_MEMO_DB)
+
 
 def _is_logged_in() -> bool:
     return bool(session.get("logged_in"))
 
 
+def _generate_job(
+    job: Job,
+    excel_bytes: bytes,
+    fecha_ddmmyyyy: str,
+    logo_bytes: Optional[bytes],
+    template: TemplateAsset,
+    default_logo: Optional[LogoAsset],
+    cache_key: str,
+    profile: bool = False,
+) -> None:
+    """
+    _build_job_pdf midiendo cada etapa (job.timings + log). Con `profile`, además
+    deja cProfile/tracemalloc de esta generación en PROFILE_DIR/<job id>.*
+    """
+    profiler = profile_to(PROFILE_DIR / job.id) if profile else nullcontext()
+    with trace(f"job {job.id}") as tr:
+        try:
+            with profiler:
+                _build_job_pdf(job, excel_bytes, fecha_ddmmyyyy, logo_bytes, template, default_logo, cache_key)
+        finally:
+            job.timings = tr.totals()
+            log.info("Tiempos %s", tr.summary())
+
+
+def _build_job_pdf(
+    job: Job,
+    excel_bytes: bytes,
+    fecha_ddmmyyyy: str,
+    logo_bytes: Optional[bytes],
+    template: TemplateAsset,
+    default_logo: Optional[LogoAsset],
+    cache_key: str,
+) -> None:
+    """Excel -> ítems -> PDF en TMP_DIR, actualizando el progreso del job. El PDF queda en RESULTS."""
+    # Extraer ítems del Excel (los errores de acá se muestran tal cual al usuario)
+    items = ItemTable()
+    for row in iter_item_rows(excel_bytes):
+        items.append_row(row)
+        job.items_parsed = len(items)
+    job.total_pages = pages_for(len(items), PDF_ENGINE)
+
+    def _progress(n: int) -> None:
+        job.pages_rendered = n
+
+    # Construir PDF directo a disco (TMP_DIR); send_file lo manda en streaming desde ahí
+    part_path = job.pdf_path.with_suffix(".part")
+    report: dict = {}
+    try:
+        with open(part_path, "wb") as sink:
+            write_pdf_from_template(
+                sink,
+                template_pdf_bytes=template.pdf_bytes,
+                items=items,
+                fecha_ddmmyyyy=fecha_ddmmyyyy,
+                logo_bytes=logo_bytes,
+                default_logo_bytes=default_logo.logo_bytes if default_logo else None,
+                template_page=template.page,
+                template_digest=template.digest,
+                default_logo_img=default_logo.image if default_logo else None,
+                progress=_progress,
+                engine=PDF_ENGINE,
+                workers=PDF_WORKERS,
+                chunk_size=PDF_CHUNK_SIZE,
+                page_cache=PAGES,
+                report=report,
+                compose=PDF_COMPOSE,
+            )
+    except Exception as e:
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
+        raise RuntimeError(f"Error generando PDF: {e}") from e
+
+    os.replace(part_path, job.pdf_path)
+    with span("result_cache_store"):
+        RESULTS.put(cache_key, job.pdf_path)
+
+    job.pages_reused = report.get("pages_reused", 0)
+    log.info(
+        "Job %s: %d páginas reutilizadas, %d renderizadas",
+        job.id, job.pages_reused, report.get("pages_rendered", 0),
+    )
+
+
+def _batch_job(job: Job, files: List[Tuple[str, bytes]], settings: BatchSettings) -> None:
+    """ZIP del lote en TMP_DIR (como el PDF de _build_job_pdf), con el progreso por archivo."""
+    job.total_files = len(files)
+
+    def _progress(done: int) -> None:
+        job.files_done = done
+
+    part_path = job.pdf_path.with_suffix(".part")
+    with trace(f"lote {job.id}") as tr:
+        try:
+            with open(part_path, "wb") as out:
+                run_batch(files, settings, out, workers=BATCH_WORKERS, progress=_progress)
+        except Exception:
+            part_path.unlink(missing_ok=True)
+            raise
+        finally:
+            job.timings = tr.totals()
+    os.replace(part_path, job.pdf_path)
+
+
+def _send_job_file(job: Job):
+    """Lo que generó el job: el PDF (con Server-Timing) o el ZIP de un lote."""
+    if job.download_name == BATCH_ZIP_NAME:
+        return send_file(job.pdf_path, as_attachment=True, download_name=BATCH_ZIP_NAME, mimetype="application/zip")
+    return _send_pdf(job.pdf_path, job.timings)
+
+
+def _send_pdf(path: Path, timings: Optional[Dict[str, float]] = None):
+    resp = send_file(
+        path,
+        as_attachment=True,
+        download_name="desglose.pdf",
+        mimetype="application/pdf",
+    )
+    if SERVER_TIMING and timings:
+        resp.headers["Server-Timing"] = server_timing(timings)
+    return resp
+
+
 @app.get("/")
 def home():
     if not _is_logged_in():
@@ -85,43 +269,146 @@ def generate():
         if not logo_bytes:
             logo_bytes = None
 
-    # Cargar template PDF
-    if not TEMPLATE_PDF_PATH.exists():
+    # Template PDF (ya parseado en ASSETS)
+    try:
+        template = ASSETS.template()
+    except FileNotFoundError:
         flash(f"No existe el template PDF en: {TEMPLATE_PDF_PATH}")
         return redirect(url_for("home"))
-    template_pdf_bytes = TEMPLATE_PDF_PATH.read_bytes()
+    except Exception as e:
+        flash(f"Error generando PDF: {e}")
+        return redirect(url_for("home"))
+
+    # Logo default (ya decodificado en ASSETS)
+    default_logo = ASSETS.default_logo()
+
+    # Mismo Excel + fecha + logo + template que una generación anterior => el PDF guardado.
+    # (match.xlsx todavía no se usa en este flujo, así que no entra en la clave)
+    if logo_bytes:
+        logo_digest = bytes_digest(logo_bytes)
+    else:
+        logo_digest = default_logo.digest if default_logo else ""
+    cache_key = result_key(
+        excel_bytes, logo_digest, fecha_ddmmyyyy, template.digest, engine=f"{PDF_ENGINE}/{PDF_COMPOSE}"
+    )
+    t0 = time.perf_counter()
+    cached = RESULTS.get(cache_key)
+    if cached is not None:
+        return _send_pdf(cached, {"result_cache": (time.perf_counter() - t0) * 1000.0})
+
+    # Perfil detallado de esta generación (solo si está habilitado en el server)
+    profile = PROFILING_ENABLED and request.values.get("profile") == "1"
+
+    job = JOBS.submit(
+        lambda j: _generate_job(
+            j, excel_bytes, fecha_ddmmyyyy, logo_bytes, template, default_logo, cache_key, profile
+        )
+    )
+
+    # Si termina dentro del presupuesto, respondemos directo como antes
+    if JOBS.wait(job, SYNC_BUDGET_SECONDS):
+        if job.status == JOB_ERROR:
+            flash(job.error)
+            return redirect(url_for("home"))
+        return _send_pdf(job.pdf_path, job.timings)
+
+    # Si no, pantalla de progreso que consulta /jobs/<id> y descarga al terminar
+    return render_template("job.html", job_id=job.id), 202
 
-    # Cargar logo default
-    default_logo_bytes = DEFAULT_LOGO_PATH.read_bytes() if DEFAULT_LOGO_PATH.exists() else None
 
-    # Extraer ítems del Excel
+@app.post("/batch")
+def batch():
+    """
+    ZIP con varios Excel -> ZIP con un PDF por Excel + resumen.json (ítems, páginas,
+    tiempos y error por archivo). Misma fecha y logo para todo el lote.
+    """
+    if not _is_logged_in():
+        return redirect(url_for("login"))
+
+    zip_file = request.files.get("excels")
+    if not zip_file or zip_file.filename.strip() == "":
+        flash("Debes subir un ZIP con los Excel.")
+        return redirect(url_for("home"))
+
     try:
-        _meta, items = extract_items_from_excel_bytes(excel_bytes)
-    except Exception as e:
-        flash(str(e))
+        dt = datetime.strptime(request.form.get("fecha", "").strip(), "%Y-%m-%d")
+        fecha_ddmmyyyy = dt.strftime("%d/%m/%Y")
+    except ValueError:
+        flash("Fecha inválida. Usa el selector calendario.")
         return redirect(url_for("home"))
 
-    # Construir PDF
+    logo_file = request.files.get("logo")
+    logo_bytes = logo_file.read() if logo_file and logo_file.filename.strip() else None
+
     try:
-        pdf_bytes = build_pdf_from_template(
-            template_pdf_bytes=template_pdf_bytes,
-            items=items,
-            fecha_ddmmyyyy=fecha_ddmmyyyy,
-            logo_bytes=logo_bytes,
-            default_logo_bytes=default_logo_bytes,
-        )
-    except Exception as e:
-        flash(f"Error generando PDF: {e}")
+        files = list(iter_zip_workbooks(
+            zip_file.read(), max_files=BATCH_MAX_FILES, max_bytes=BATCH_MAX_UNCOMPRESSED_BYTES
+        ))
+    except ValueError as e:
+        flash(str(e))
         return redirect(url_for("home"))
 
-    return send_file(
-        os.path.join("tmp", "desglose.pdf"),
-        as_attachment=True,
-        download_name="desglose.pdf",
-        mimetype="application/pdf",
-        data=pdf_bytes,  # Flask moderno permite data=bytes
+    settings = BatchSettings(
+        template_path=TEMPLATE_PDF_PATH,
+        default_logo_path=DEFAULT_LOGO_PATH,
+        match_path=MATCH_XLSX_PATH,
+        fecha_ddmmyyyy=fecha_ddmmyyyy,
+        logo_bytes=logo_bytes or None,
+        engine=PDF_ENGINE,
+        compose=PDF_COMPOSE,
+        match_mode=MATCH_MODE,
+        memo_max_entries=MATCH_MEMO_MAX_ENTRIES,
+        memo_db=MATCH_MEMO_DB,
     )
 
+    # Como /generate: job en segundo plano; si termina dentro del presupuesto se responde directo
+    job = JOBS.submit(lambda j: _batch_job(j, files, settings), download_name=BATCH_ZIP_NAME)
+    if JOBS.wait(job, SYNC_BUDGET_SECONDS):
+        if job.status == JOB_ERROR:
+            flash(f"Error generando el lote: {job.error}")
+            return redirect(url_for("home"))
+        return _send_job_file(job)
+    return render_template("job.html", job_id=job.id), 202
+
+
+@app.get("/jobs/<job_id>")
+def job_status(job_id: str):
+    if not _is_logged_in():
+        return jsonify({"error": "no autenticado"}), 401
+
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "job inexistente o vencido"}), 404
+
+    data = job.to_dict()
+    if job.status == JOB_DONE:
+        data["download_url"] = url_for("job_download", job_id=job.id)
+    return jsonify(data)
+
+
+@app.get("/jobs/<job_id>/download")
+def job_download(job_id: str):
+    if not _is_logged_in():
+        return redirect(url_for("login"))
+
+    job = JOBS.get(job_id)
+    if job is None or job.status != JOB_DONE or not job.pdf_path.exists():
+        flash("El PDF no está disponible (todavía no terminó o ya venció).")
+        return redirect(url_for("home"))
+    return _send_job_file(job)
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    if not _is_logged_in():
+        return jsonify({"error": "no autenticado"}), 401
+    return jsonify({
+        "results": RESULTS.stats(),
+        "pages": PAGES.stats(),
+        "match": match_cache_stats(),
+        "match_memo": match_memo_stats(),
+    })
+
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Genera los desgloses de todos los Excel de una carpeta (recursivo) en un ZIP:
+un PDF por Excel + resumen.json (ítems, páginas, tiempos y errores de cada archivo).
+
+Uso:
+    python batch_cli.py presupuestos/ --fecha 2025-01-31 --out desgloses.zip
+    python batch_cli.py presupuestos/ --logo logo.png --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+from config import (
+    BATCH_WORKERS,
+    DEFAULT_LOGO_PATH,
+    MATCH_MEMO_DB,
+    MATCH_MEMO_MAX_ENTRIES,
+    MATCH_MODE,
+    MATCH_XLSX_PATH,
+    PDF_COMPOSE,
+    PDF_ENGINE,
+    TEMPLATE_PDF_PATH,
+)
+from services.batch import BatchSettings, iter_dir_workbooks, run_batch
+from services.match_engine import MATCH_MODES
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("directory", type=Path, help="carpeta con los Excel (.xlsx / .xlsm)")
+    ap.add_argument("--fecha", default=date.today().isoformat(), help="YYYY-MM-DD (default: hoy)")
+    ap.add_argument("--out", type=Path, default=Path("desgloses.zip"))
+    ap.add_argument("--logo", type=Path, help="logo para todos los PDFs (default: el logo default)")
+    ap.add_argument("--match", type=Path, default=MATCH_XLSX_PATH, help="match.xlsx")
+    ap.add_argument("--match-mode", choices=MATCH_MODES, default=MATCH_MODE)
+    ap.add_argument("--no-memo", action="store_true", help="sin memo de match (puntúa todas las descripciones)")
+    ap.add_argument("--workers", type=int, default=BATCH_WORKERS, help="procesos (default: cpu_count)")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    try:
+        fecha_ddmmyyyy = datetime.strptime(args.fecha, "%Y-%m-%d").strftime("%d/%m/%Y")
+    except ValueError:
+        ap.error(f"fecha inválida: {args.fecha!r} (formato YYYY-MM-DD)")
+
+    files = list(iter_dir_workbooks(args.directory))
+    if not files:
+        print(f"No hay archivos Excel en {args.directory}", file=sys.stderr)
+        return 1
+
+    settings = BatchSettings(
+        template_path=TEMPLATE_PDF_PATH,
+        default_logo_path=DEFAULT_LOGO_PATH,
+        match_path=args.match,
+        fecha_ddmmyyyy=fecha_ddmmyyyy,
+        logo_bytes=args.logo.read_bytes() if args.logo else None,
+        engine=PDF_ENGINE,
+        compose=PDF_COMPOSE,
+        match_mode=args.match_mode,
+        memo_max_entries=0 if args.no_memo else MATCH_MEMO_MAX_ENTRIES,
+        memo_db=None if args.no_memo else MATCH_MEMO_DB,
+    )
+
+    t0 = time.perf_counter()
+    with open(args.out, "wb") as out:
+        results = run_batch(files, settings, out, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+
+    for r in results:
+        status = f"ERROR: {r.error}" if r.error else f"{r.items} ítems, {r.pages} págs"
+        print(f"  {r.name}: {status} ({r.timings.get('total', 0.0):.0f} ms)")
+    failed = sum(1 for r in results if r.error)
+    print(f"{len(results) - failed}/{len(results)} PDFs en {args.out} ({elapsed:.1f}s)")
+    hits = sum(r.memo_hits for r in results)
+    lookups = hits + sum(r.memo_misses for r in results)
+    if lookups:
+        print(f"Memo de match: {hits}/{lookups} descripciones sin puntuar ({hits / lookups:.0%})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
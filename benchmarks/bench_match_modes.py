@@ -0,0 +1,74 @@
+"""
+Benchmark de enrich_items_with_match: modo "keyword" contra "tfidf".
+
+Filas de match sintéticas (benchmarks.synth) e ítems armados a partir de esas filas con
+ruido (plurales, letras invertidas, palabras de más), para ver tiempo y cuántos ítems
+vuelven a su fila de origen.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_match_modes --rows 5000 --items 50000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synth import make_match_xlsx, match_descriptions
+from services.match_engine import MATCH_MODES, enrich_items_with_match, load_match_table
+
+
+def _noisy(rng: random.Random, desc: str) -> str:
+    words = desc.split()
+    i = rng.randrange(len(words))
+    w = words[i]
+    r = rng.random()
+    if r < 0.35 and len(w) > 3:
+        j = rng.randrange(len(w) - 1)
+        w = w[:j] + w[j + 1] + w[j] + w[j + 2:]  # typo: dos letras invertidas
+    elif r < 0.7:
+        w += "s" if not w.endswith("s") else ""  # plural
+    else:
+        w += " incluye provisión"
+    words[i] = w
+    return " ".join(words)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=5000, help="filas de match.xlsx")
+    ap.add_argument("--items", type=int, default=50000)
+    ap.add_argument("--threshold", type=float, default=0.80)
+    ap.add_argument("--modes", nargs="+", default=list(MATCH_MODES), choices=MATCH_MODES)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    match_bytes = make_match_xlsx(args.rows, seed=args.seed)
+    descs = match_descriptions(match_bytes)
+    sources = [rng.choice(descs) for _ in range(args.items)]
+    items = [{"descripcion": _noisy(rng, d)} for d in sources]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "match.xlsx")
+        Path(path).write_bytes(match_bytes)
+        load_match_table(path)
+
+        print(f"{args.rows} filas de match, {args.items} ítems ({len(set(i['descripcion'] for i in items))} distintos)")
+        for mode in args.modes:
+            t0 = time.perf_counter()
+            out = enrich_items_with_match(items, path, args.threshold, mode=mode)
+            dt = time.perf_counter() - t0
+
+            same = sum(1 for it, src in zip(out, sources) if it["match_desc"] == src)
+            default = sum(1 for it in out if it["match_desc"] == "DEFAULT")
+            print(
+                f"  {mode:>7}: {dt:6.2f}s ({args.items / dt:8.0f} ítems/s)  "
+                f"fila de origen {same / args.items:6.1%}  DEFAULT {default / args.items:6.1%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark de throughput del parser numérico (services.num_parse) sobre celdas mezcladas:
+números nativos, "Gs. 1.234.567", "1.234.567,50", "12,5", vacíos y texto.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_num_parse --cells 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from services.num_parse import _parse_str_general, parse_number, parse_numbers
+
+
+def _legacy(v):
+    # parser anterior: siempre la cadena completa de replace/split/regex
+    if v is None or isinstance(v, (int, float)):
+        return parse_number(v)
+    s = str(v).strip()
+    return _parse_str_general(s) if s else None
+
+
+def _fake_cells(n: int):
+    random.seed(0)
+    distinct = max(n // 20, 1)
+    texts = []
+    for _ in range(distinct):
+        x = random.randint(0, 50_000_000)
+        miles = f"{x:,}".replace(",", ".")
+        texts.append(random.choice([
+            f"Gs. {miles}",
+            miles,
+            f"{miles},{random.randint(0, 99):02d}",
+            f"{x % 1000},{random.randint(1, 9)}",
+            f"{x % 1000}.{random.randint(10, 99)}",
+            "",
+            "s/d",
+        ]))
+
+    cells = []
+    for _ in range(n):
+        r = random.random()
+        if r < 0.35:
+            cells.append(random.randint(0, 50_000_000))
+        elif r < 0.45:
+            cells.append(random.random() * 1000)
+        elif r < 0.50:
+            cells.append(None)
+        else:
+            cells.append(random.choice(texts))
+    return cells
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--cells", type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    cells = _fake_cells(args.cells)
+
+    t0 = time.perf_counter()
+    old = [_legacy(v) for v in cells]
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    single = [parse_number(v) for v in cells]
+    t_single = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = parse_numbers(cells)
+    t_batch = time.perf_counter() - t0
+
+    assert old == single == batch
+
+    n = len(cells)
+    print(f"celdas: {n:,}")
+    print(f"  anterior          : {t_old:.2f}s ({n / t_old:,.0f} celdas/s)")
+    print(f"  parse_number      : {t_single:.2f}s ({n / t_single:,.0f} celdas/s)  x{t_old / t_single:.1f}")
+    print(f"  parse_numbers     : {t_batch:.2f}s ({n / t_batch:,.0f} celdas/s)  x{t_old / t_batch:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark del cache de páginas: re-uploads sucesivos del mismo Excel con una fila
+corregida cada vez (el caso de services.page_cache).
+
+Muestra tiempo, tamaño y páginas reusadas por ronda, y falla (exit 1) si el PDF crece
+de una ronda a otra: las páginas reusadas no deben sumar copias del template / logo.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_page_cache --items 40 --rounds 6
+    python -m benchmarks.bench_page_cache --items 500 --engines batch two_up --compose xobject
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_pdf_engines import _fake_items
+from config import DEFAULT_LOGO_PATH, TEMPLATE_PDF_PATH
+from services.page_cache import PageCache
+from services.pdf_builder import PDF_COMPOSE_MODES, PDF_ENGINES, write_pdf_from_template
+
+# Tolerancia para "no crece": la fila corregida cambia un poco el largo del texto
+_GROWTH_TOLERANCE = 0.02
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--items", type=int, default=40)
+    ap.add_argument("--rounds", type=int, default=6, help="generaciones (la primera sin cache)")
+    ap.add_argument("--engines", nargs="+", default=["batch", "two_up"], choices=PDF_ENGINES)
+    ap.add_argument("--compose", nargs="+", default=list(PDF_COMPOSE_MODES), choices=PDF_COMPOSE_MODES)
+    args = ap.parse_args()
+
+    template = TEMPLATE_PDF_PATH.read_bytes()
+    logo = DEFAULT_LOGO_PATH.read_bytes() if DEFAULT_LOGO_PATH.exists() else None
+
+    failed = []
+    for engine in args.engines:
+        for compose in args.compose:
+            items = _fake_items(args.items)
+            sizes = []
+            with tempfile.TemporaryDirectory() as tmp:
+                cache = PageCache(Path(tmp), max_bytes=1 << 34)
+                for r in range(args.rounds):
+                    if r:
+                        row = items[r % len(items)]
+                        row["descripcion"] += " (corregido)"
+                    out = io.BytesIO()
+                    report: dict = {}
+                    t0 = time.perf_counter()
+                    write_pdf_from_template(
+                        out,
+                        template_pdf_bytes=template,
+                        items=items,
+                        fecha_ddmmyyyy="01/01/2026",
+                        logo_bytes=None,
+                        default_logo_bytes=logo,
+                        engine=engine,
+                        page_cache=cache,
+                        report=report,
+                        compose=compose,
+                    )
+                    dt = time.perf_counter() - t0
+                    sizes.append(out.tell())
+                    print(
+                        f"{engine:>9}/{compose:<7} ronda {r}: {dt:.2f}s, {out.tell() / 1024:.0f} KiB, "
+                        f"{report['pages_reused']} reusadas / {report['pages_rendered']} renderizadas"
+                    )
+
+            if max(sizes) > sizes[0] * (1 + _GROWTH_TOLERANCE):
+                failed.append(f"{engine}/{compose}")
+
+    if failed:
+        print(f"El PDF crece con cada re-upload en: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    print("Tamaño estable en todas las rondas.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Benchmark de write_pdf_from_template: engines "batch", "per_item", "parallel" y "two_up".
+
+Muestra páginas/s, ítems/s y bytes por página / por ítem (two_up imprime 2 ítems por hoja),
+para cada modo de composición del template ("xobject": una copia compartida del template,
+"merge": una copia por hoja).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_pdf_engines --items 500
+    python -m benchmarks.bench_pdf_engines --items 5000 --engines batch parallel --workers 8
+    python -m benchmarks.bench_pdf_engines --items 1000 --engines batch two_up
+    python -m benchmarks.bench_pdf_engines --items 200 --engines batch --compose merge xobject
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import time
+
+from config import DEFAULT_LOGO_PATH, TEMPLATE_PDF_PATH
+from services.pdf_builder import PDF_COMPOSE_MODES, PDF_ENGINES, write_pdf_from_template
+
+
+def _fake_items(n: int):
+    return [
+        {
+            "nro": i + 1,
+            "descripcion": f"PROVISION Y COLOCACION DE CABLE NYY 3x{(i % 6) + 1}mm TRAMO {i}",
+            "unidad": "ML",
+            "cantidad": 1.0,
+            "precio_total": 150000 + i,
+            # como si ya pasaran por enrich_items_with_match (cajas A / E del two_up)
+            "a_herramientas": "herramientas de mano, escalera, pinza amperométrica",
+            "a_materiales": f"cable NYY 3x{(i % 6) + 1}mm, cinta aisladora, terminales",
+        }
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--items", type=int, default=300)
+    ap.add_argument("--engines", nargs="+", default=list(PDF_ENGINES), choices=PDF_ENGINES)
+    ap.add_argument("--workers", type=int, default=None, help="solo engine parallel (default: cpu_count)")
+    ap.add_argument("--chunk-size", type=int, default=None, help="solo engine parallel")
+    ap.add_argument("--compose", nargs="+", default=list(PDF_COMPOSE_MODES), choices=PDF_COMPOSE_MODES)
+    args = ap.parse_args()
+
+    template = TEMPLATE_PDF_PATH.read_bytes()
+    logo = DEFAULT_LOGO_PATH.read_bytes() if DEFAULT_LOGO_PATH.exists() else None
+    items = _fake_items(args.items)
+
+    for engine in args.engines:
+        for compose in args.compose:
+            out = io.BytesIO()
+            t0 = time.perf_counter()
+            pages = write_pdf_from_template(
+                out,
+                template_pdf_bytes=template,
+                items=items,
+                fecha_ddmmyyyy="01/01/2026",
+                logo_bytes=None,
+                default_logo_bytes=logo,
+                engine=engine,
+                workers=args.workers,
+                chunk_size=args.chunk_size,
+                compose=compose,
+            )
+            dt = time.perf_counter() - t0
+            size = out.tell()
+            print(
+                f"{engine:>9}/{compose:<7}: {args.items} ítems / {pages} págs en {dt:.2f}s "
+                f"({pages / dt:.1f} pág/s, {args.items / dt:.1f} ítems/s), {size / 1024:.0f} KiB "
+                f"({size / max(pages, 1) / 1024:.1f} KiB/pág, {size / max(args.items, 1) / 1024:.1f} KiB/ítem)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Benchmark del pipeline completo sobre datos sintéticos (benchmarks.synth), por etapa y
+de punta a punta, con resultado en JSON para comparar entre commits.
+
+Etapas (cada una medida `--repeat` veces, se reporta mínimo y mediana):
+  extract   extract_items_from_excel_bytes
+  match     enrich_items_with_match (match.xlsx ya cargado; "match_load" = carga en frío)
+  costing   build_cpu_pages
+  pdf       build_pdf_from_template (solo los primeros --pdf-items ítems: es la etapa lenta)
+  e2e       las cuatro seguidas dentro de un profiling.trace (se guardan también los spans)
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_pipeline --items 5000 --pdf-items 40 --out bench.json
+    python -m benchmarks.bench_pipeline --items 5000 --compare bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synth import header_variants, make_items_xlsx, make_match_xlsx, match_descriptions
+from config import DEFAULT_LOGO_PATH, TEMPLATE_PDF_PATH
+from services.costing_engine import build_cpu_pages
+from services.extract_items import extract_items_from_excel_bytes
+from services.match_engine import _MATCH_CACHE, enrich_items_with_match
+from services.pdf_builder import PDF_COMPOSE_MODES, PDF_ENGINES, build_pdf_from_template
+from services.profiling import trace
+
+FECHA = "01/01/2025"
+FECHA_ISO = "2025-01-01"
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> List[float]:
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def _result(samples: List[float], n: int) -> Dict[str, Any]:
+    best = min(samples)
+    return {
+        "n": n,
+        "min_s": round(best, 5),
+        "median_s": round(statistics.median(samples), 5),
+        "per_s": round(n / best, 1) if best else 0.0,
+    }
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    variants = header_variants()
+    template_bytes = TEMPLATE_PDF_PATH.read_bytes()
+    default_logo = DEFAULT_LOGO_PATH.read_bytes()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        match_bytes = make_match_xlsx(args.match_rows, seed=args.seed)
+        match_path = str(Path(tmp) / "match.xlsx")
+        Path(match_path).write_bytes(match_bytes)
+        descs = match_descriptions(match_bytes)
+
+        xlsx = make_items_xlsx(args.items, seed=args.seed, headers=variants[args.header % len(variants)],
+                               descripciones=descs)
+        pdf_xlsx = make_items_xlsx(args.pdf_items, seed=args.seed + 1, descripciones=descs)
+
+        stages: Dict[str, Any] = {}
+
+        samples = _time(lambda: extract_items_from_excel_bytes(xlsx), args.repeat)
+        stages["extract"] = _result(samples, args.items)
+
+        def cold_load() -> None:
+            _MATCH_CACHE.clear()
+            enrich_items_with_match(extract_items_from_excel_bytes(make_items_xlsx(1))[1], match_path)
+
+        stages["match_load"] = _result(_time(cold_load, args.repeat), args.match_rows)
+
+        # Cada repetición sobre una tabla recién extraída (enrich anota en el lugar)
+        tables = [extract_items_from_excel_bytes(xlsx)[1] for _ in range(args.repeat)]
+        it = iter(tables)
+        samples = _time(lambda: enrich_items_with_match(next(it), match_path), args.repeat)
+        stages["match"] = _result(samples, args.items)
+
+        samples = _time(lambda: build_cpu_pages(tables[0], FECHA_ISO), args.repeat)
+        stages["costing"] = _result(samples, args.items)
+
+        _, pdf_items = extract_items_from_excel_bytes(pdf_xlsx)
+        enrich_items_with_match(pdf_items, match_path)
+        pdf_items = build_cpu_pages(pdf_items, FECHA_ISO)
+        sizes = []
+
+        def pdf() -> None:
+            sizes.append(len(build_pdf_from_template(
+                template_bytes, pdf_items, FECHA, None, default_logo, engine=args.engine, compose=args.compose
+            )))
+
+        stages["pdf"] = _result(_time(pdf, args.repeat), args.pdf_items)
+        stages["pdf"]["bytes"] = sizes[-1]
+
+        def e2e() -> Dict[str, float]:
+            with trace("bench") as tr:
+                _, items = extract_items_from_excel_bytes(pdf_xlsx)
+                enrich_items_with_match(items, match_path)
+                cpus = build_cpu_pages(items, FECHA_ISO)
+                build_pdf_from_template(
+                    template_bytes, cpus, FECHA, None, default_logo, engine=args.engine, compose=args.compose
+                )
+            return tr.totals()
+
+        spans = [e2e() for _ in range(args.repeat)]
+        best = min(spans, key=lambda s: s["total"])
+        stages["e2e"] = _result([s["total"] / 1000.0 for s in spans], args.pdf_items)
+        stages["e2e"]["spans_ms"] = best
+
+    return {
+        "commit": _git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {
+            "items": args.items,
+            "pdf_items": args.pdf_items,
+            "match_rows": args.match_rows,
+            "engine": args.engine,
+            "compose": args.compose,
+            "header": variants[args.header % len(variants)],
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "stages": stages,
+    }
+
+
+def _print(result: Dict[str, Any], base: Dict[str, Any] | None) -> None:
+    head = f"commit {result['commit'] or '?'}"
+    if base:
+        head += f"  vs  {base.get('commit') or '?'}"
+    print(head)
+    for name, st in result["stages"].items():
+        line = f"  {name:<11}{st['n']:>7}  {st['min_s'] * 1000:10.1f} ms  {st['per_s']:>10.1f}/s"
+        prev = (base or {}).get("stages", {}).get(name)
+        if prev and prev.get("min_s"):
+            ratio = st["min_s"] / prev["min_s"]
+            line += f"   {ratio:5.2f}x {'(más lento)' if ratio > 1 + 0.10 else ''}"
+        print(line)
+    spans = result["stages"].get("e2e", {}).get("spans_ms")
+    if spans:
+        print("  spans e2e: " + ", ".join(f"{k}={v:.0f}" for k, v in spans.items()))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--items", type=int, default=5000, help="ítems de la planilla (extract/match/costing)")
+    ap.add_argument("--pdf-items", type=int, default=40, help="ítems para las etapas pdf y e2e")
+    ap.add_argument("--match-rows", type=int, default=300, help="filas del match.xlsx sintético")
+    ap.add_argument("--engine", choices=PDF_ENGINES, default="batch")
+    ap.add_argument("--compose", choices=PDF_COMPOSE_MODES, default="xobject")
+    ap.add_argument("--header", type=int, default=0, help="índice de variante de encabezados")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", type=Path, help="guardar el resultado en este JSON")
+    ap.add_argument("--compare", type=Path, help="JSON de una corrida anterior para comparar")
+    args = ap.parse_args()
+
+    result = run(args)
+    base = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+    if base and base.get("params") != result["params"]:
+        print("Aviso: la corrida de referencia usó otros parámetros", file=sys.stderr)
+    _print(result, base)
+
+    if args.out:
+        args.out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Guardado en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
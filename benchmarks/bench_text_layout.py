@@ -0,0 +1,96 @@
+"""
+Micro-benchmark del wrap de descripciones (services.text_layout.wrap_text) contra el
+_wrap_text anterior (stringWidth sobre la línea acumulada en cada palabra).
+
+Descripciones largas (500+ caracteres); "frío" = cache de wrap vacío (solo sirve la tabla
+de anchos por palabra), "repetido" = las mismas descripciones otra vez (memoizado).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_text_layout --n 2000 --chars 600
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from services.pdf_builder import FONT_NAME, FONT_SIZE
+from services.text_layout import wrap_text
+
+MAX_WIDTH = 315.0  # ancho de la descripción en el engine "batch"
+PALABRAS = (
+    "provisión colocación cable NYY 3x2,5mm² cañería PVC Ø110mm excavación zanja hormigón "
+    "armado fck 210 kg/cm² losa tablero eléctrico mantenimiento preventivo correctivo "
+    "incluye materiales mano de obra herramientas transporte retiro escombros limpieza "
+    "final pintura látex acrílica 2 manos según especificaciones técnicas del pliego"
+).split()
+
+
+def _wrap_text_old(text: str, max_width: float):
+    words = (text or "").split()
+    if not words:
+        return [""]
+
+    lines = []
+    current = words[0]
+    for w in words[1:]:
+        test = current + " " + w
+        if stringWidth(test, FONT_NAME, FONT_SIZE) <= max_width:
+            current = test
+        else:
+            lines.append(current)
+            current = w
+    lines.append(current)
+    return lines
+
+
+def _descripcion(rng: random.Random, chars: int) -> str:
+    out = []
+    size = 0
+    while size < chars:
+        w = rng.choice(PALABRAS)
+        out.append(w)
+        size += len(w) + 1
+    return " ".join(out)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--n", type=int, default=2000, help="descripciones distintas")
+    ap.add_argument("--chars", type=int, default=600, help="largo de cada descripción")
+    ap.add_argument("--max-lines", type=int, default=3)
+    args = ap.parse_args()
+
+    rng = random.Random(42)
+    descs = [_descripcion(rng, args.chars) for _ in range(args.n)]
+
+    for d in descs[:200]:
+        assert list(wrap_text(d, MAX_WIDTH, FONT_NAME, FONT_SIZE)) == _wrap_text_old(d, MAX_WIDTH)
+    wrap_text.cache_clear()
+
+    t0 = time.perf_counter()
+    for d in descs:
+        _wrap_text_old(d, MAX_WIDTH)[: args.max_lines]
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for d in descs:
+        wrap_text(d, MAX_WIDTH, FONT_NAME, FONT_SIZE, args.max_lines)
+    t_cold = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for d in descs:
+        wrap_text(d, MAX_WIDTH, FONT_NAME, FONT_SIZE, args.max_lines)
+    t_warm = time.perf_counter() - t0
+
+    print(f"{args.n} descripciones de ~{args.chars} caracteres, max_lines={args.max_lines}")
+    print(f"  anterior:          {t_old * 1e6 / args.n:8.1f} µs/desc")
+    print(f"  wrap_text frío:    {t_cold * 1e6 / args.n:8.1f} µs/desc  ({t_old / t_cold:.1f}x)")
+    print(f"  wrap_text repetido:{t_warm * 1e6 / args.n:8.1f} µs/desc  ({t_old / t_warm:.0f}x)")
+    print(f"  {wrap_text.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark de la normalización de texto (services.text_norm.norm_text)
+contra la implementación anterior (NFD + filtro por categoría + 2 re.sub por llamada).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_text_norm --n 200000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+import unicodedata
+
+from services.text_norm import _norm_str, norm_text
+
+DESCRIPCIONES = [
+    "Excavación de zanja para cañería de PVC Ø 110 mm",
+    "Provisión y colocación de cable NYY 3x2,5 mm² (incluye cañería)",
+    "CARGA DE GAS REFRIGERANTE POR LITRO PARA A.A TIPO SPLIT DE 12.000 BTU",
+    "Limpieza / lavado de radiador – unidad condensadora",
+    "Mantenimiento preventivo de tableros eléctricos (Tavarandu)",
+    "Reparación de techo en aula de la Escuela Ñu Guasu",
+    "Pintura látex acrílica en paredes interiores, 2 manos",
+    "Instalación de bomba centrífuga 1 HP – Yvyraty",
+    "Cambio de capacitor A.A. tipo split, marca: MIDEA / CARRIER",
+    "Mbarakaja pe ogapype: ñemopotĩ ha ñembojeguaka",
+    "Provisión de hormigón armado fck 210 kg/cm² para losa",
+    "Desmonte y retiro de equipos en desuso",
+]
+ENCABEZADOS = ["Ítem", "Descripción del Bien", "Unidad de Medida", "Cantidad", "Precio Total IVA incluido", None, 1]
+
+
+def _norm_legacy(s):
+    if s is None:
+        return ""
+    s = str(s).strip().lower()
+    s = unicodedata.normalize("NFD", s)
+    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
+    s = re.sub(r"[^a-z0-9]+", " ", s).strip()
+    s = re.sub(r"\s+", " ", s)
+    return s
+
+
+def _timeit(fn, values) -> float:
+    t0 = time.perf_counter()
+    for v in values:
+        fn(v)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--n", type=int, default=200_000, help="cantidad de strings a normalizar")
+    ap.add_argument("--distinct", type=int, default=5_000, help="descripciones distintas (resto repetidas)")
+    args = ap.parse_args()
+
+    random.seed(0)
+    distinct = [f"{random.choice(DESCRIPCIONES)} {i}" for i in range(args.distinct)]
+    values = [random.choice(distinct) for _ in range(args.n)] + ENCABEZADOS * (args.n // 100)
+
+    assert all(norm_text(v) == _norm_legacy(v) for v in distinct + ENCABEZADOS)
+
+    t_old = _timeit(_norm_legacy, values)
+    _norm_str.cache_clear()
+    t_new = _timeit(norm_text, values)
+    _norm_str.cache_clear()
+    t_nocache = _timeit(_norm_str.__wrapped__, [v for v in values if isinstance(v, str)])
+
+    n = len(values)
+    print(f"strings: {n} ({args.distinct} descripciones distintas)")
+    print(f"  anterior       : {t_old:.3f}s ({n / t_old:,.0f}/s)")
+    print(f"  norm_text (LRU): {t_new:.3f}s ({n / t_new:,.0f}/s)  x{t_old / t_new:.1f}")
+    print(f"  norm_text s/LRU: {t_nocache:.3f}s  x{t_old / t_nocache:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Generadores de datos sintéticos para los benchmarks: planillas de ítems (con las
+variantes de encabezado que acepta extract_items) y tablas match.xlsx.
+"""
+from __future__ import annotations
+
+import io
+import random
+from typing import Dict, List, Optional
+
+import openpyxl
+
+from services.extract_items import _HEADER_FUZZY, _HEADER_KEYS
+
+FIELDS = ("nro", "descripcion", "unidad", "cantidad", "precio_total")
+
+_TRABAJOS = [
+    "Provisión y colocación de cable NYY {n}x{s} mm²",
+    "Excavación de zanja para cañería de PVC Ø {d} mm",
+    "Mantenimiento preventivo de tablero eléctrico {t}",
+    "Carga de gas refrigerante para A.A. split de {b}.000 BTU",
+    "Pintura látex acrílica en paredes interiores, {m} manos",
+    "Reparación de techo de chapa en {lugar}",
+    "Instalación de bomba centrífuga {hp} HP",
+    "Hormigón armado fck {f} kg/cm² para {pieza}",
+    "Cambio de capacitor de A.A. tipo split marca {marca}",
+    "Limpieza y lavado de unidad condensadora {t}",
+]
+_LUGARES = ["aula", "galería", "depósito", "baño de funcionarios", "cocina", "pasillo central"]
+_PIEZAS = ["losa", "viga", "columna", "zapata", "contrapiso"]
+_MARCAS = ["MIDEA", "CARRIER", "LG", "SAMSUNG", "TOKYO"]
+_TABLEROS = ["TG", "TS1", "TS2", "de bombas", "de iluminación"]
+_HERRAMIENTAS = ["escalera", "taladro", "amoladora", "pinza amperométrica", "multímetro", "manómetro",
+                 "hormigonera", "vibrador", "andamio", "llaves combinadas"]
+_MATERIALES = ["cable NYY", "cinta aisladora", "terminales", "caño PVC", "cemento", "arena lavada",
+               "pintura látex", "gas R410", "capacitor", "tornillos autoperforantes"]
+_UNIDADES = ["UNI", "ML", "M2", "M3", "GL", "KG"]
+
+
+def descripcion(rng: random.Random) -> str:
+    return rng.choice(_TRABAJOS).format(
+        n=rng.choice([2, 3, 4]), s=rng.choice(["2,5", "4", "6", "10"]), d=rng.choice([50, 75, 110]),
+        t=rng.choice(_TABLEROS), b=rng.choice([9, 12, 18, 24]), m=rng.choice([2, 3]),
+        lugar=rng.choice(_LUGARES), hp=rng.choice(["1/2", "1", "2"]), f=rng.choice([180, 210, 250]),
+        pieza=rng.choice(_PIEZAS), marca=rng.choice(_MARCAS),
+    )
+
+
+def header_variants() -> List[Dict[str, str]]:
+    """
+    Juegos de encabezados reconocidos por extract_items: uno por cada variante de la
+    columna descripción, combinada (rotando) con las variantes de las otras columnas.
+    """
+    pools = {f: sorted(_HEADER_KEYS[f] | _HEADER_FUZZY[f]) for f in FIELDS}
+    n = max(len(p) for p in pools.values())
+    return [{f: pools[f][i % len(pools[f])].title() for f in FIELDS} for i in range(n)]
+
+
+def _money(rng: random.Random, value: int) -> object:
+    """El mismo monto en los formatos que aparecen en planillas reales."""
+    miles = f"{value:,}".replace(",", ".")
+    return rng.choice([value, value, f"Gs. {miles}", miles, f"{miles},00"])
+
+
+def make_items_xlsx(
+    n_items: int,
+    seed: int = 0,
+    headers: Optional[Dict[str, str]] = None,
+    descripciones: Optional[List[str]] = None,
+    title_rows: int = 2,
+) -> bytes:
+    """
+    Planilla de ítems: `title_rows` filas de título, encabezado, `n_items` ítems.
+    descripciones: si viene (p.ej. las del match.xlsx sintético), ~70% de los ítems usan una de esas.
+    """
+    rng = random.Random(seed)
+    headers = headers or header_variants()[seed % len(header_variants())]
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Planilla")
+    for i in range(title_rows):
+        ws.append([f"Licitación {seed} - planilla de precios" if i == 0 else None])
+    ws.append([headers[f] for f in FIELDS])
+
+    for i in range(n_items):
+        if descripciones and rng.random() < 0.7:
+            desc = rng.choice(descripciones)
+        else:
+            desc = descripcion(rng)
+        qty = rng.choice([1, 2, 3.5, "4", "1,5", None])
+        ws.append([i + 1, desc, rng.choice(_UNIDADES), qty, _money(rng, rng.randint(10_000, 90_000_000))])
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def make_match_xlsx(n_rows: int, seed: int = 0) -> bytes:
+    """match.xlsx con Descripción / Herramientas / Materiales, una fila DEFAULT y `n_rows` filas de match."""
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Match")
+    ws.append(["Descripción", "Herramientas", "Materiales"])
+    ws.append(["DEFAULT", "herramientas de mano", "consumibles varios"])
+
+    seen = set()
+    while len(seen) < n_rows:
+        desc = descripcion(rng)
+        if rng.random() < 0.5:
+            desc += f" - sector {rng.randint(1, n_rows)}"
+        if desc in seen:
+            continue
+        seen.add(desc)
+        ws.append([
+            desc,
+            ", ".join(rng.sample(_HERRAMIENTAS, 3)),
+            ", ".join(rng.sample(_MATERIALES, 3)),
+        ])
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def match_descriptions(match_xlsx: bytes) -> List[str]:
+    """Descripciones (sin DEFAULT) de un match.xlsx, para armar ítems que sí matchean."""
+    wb = openpyxl.load_workbook(io.BytesIO(match_xlsx), read_only=True)
+    try:
+        rows = wb.active.iter_rows(min_row=3, max_col=1, values_only=True)
+        return [r[0] for r in rows if r[0]]
+    finally:
+        wb.close()
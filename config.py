@@ -27,6 +27,47 @@ load_dotenv()
 APP_PASSWORD = os.getenv("APP_PASSWORD", "")
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key")
 
+# Motor de PDF: "batch" (1 proceso), "parallel" (overlays en varios procesos) o "two_up" (2 ítems por hoja)
+PDF_ENGINE = os.getenv("PDF_ENGINE", "batch")
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0")) or None  # 0 => cpu_count
+PDF_CHUNK_SIZE = int(os.getenv("PDF_CHUNK_SIZE", "0")) or None  # 0 => len(items) / workers
+# Template en el PDF: "xobject" (una sola copia compartida por todas las hojas) o "merge" (una copia por hoja)
+PDF_COMPOSE = os.getenv("PDF_COMPOSE", "xobject")
+
+# Match contra match.xlsx: "keyword" (tokens exactos) o "tfidf" (tolera plurales / typos)
+MATCH_MODE = os.getenv("MATCH_MODE", "keyword")
+# Memo descripción -> fila de match entre requests / archivos del lote (0 => desactivado)
+MATCH_MEMO_MAX_ENTRIES = int(os.getenv("MATCH_MEMO_MAX_ENTRIES", "50000"))
+# Copia en SQLite: sobrevive reinicios y la comparten los procesos del lote ("0" => solo memoria)
+MATCH_MEMO_DB = TMP_DIR / "match_memo.sqlite3" if os.getenv("MATCH_MEMO_PERSIST", "1") != "0" else None
+
+# Lotes (/batch y batch_cli.py): un proceso por archivo en paralelo
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "0")) or None  # 0 => cpu_count
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))
+# Tope de lo que ocupan descomprimidos los Excel del ZIP subido (el ZIP se abre en memoria)
+BATCH_MAX_UNCOMPRESSED_BYTES = int(float(os.getenv("BATCH_MAX_UNCOMPRESSED_MB", "500")) * 1024 * 1024)
+
+# Generación en segundo plano
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+# Si el PDF sale en menos de esto, /generate lo devuelve directo (sin pasar por la pantalla de estado)
+SYNC_BUDGET_SECONDS = float(os.getenv("SYNC_BUDGET_SECONDS", "10"))
+
+# Cache de PDFs generados (mismo Excel + fecha + logo + template => mismo PDF)
+RESULT_CACHE_DIR = TMP_DIR / "results"
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "512"))  # 0 => desactivado
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+
+# Páginas ya compuestas de PDFs anteriores (re-upload con pocas filas cambiadas)
+PAGE_CACHE_DIR = TMP_DIR / "pages"
+PAGE_CACHE_MAX_MB = float(os.getenv("PAGE_CACHE_MAX_MB", "1024"))  # 0 => desactivado
+
+# Instrumentación: header Server-Timing con los tiempos por etapa en la respuesta del PDF
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+# Permite pedir cProfile + tracemalloc de UNA generación con profile=1 (lento; solo para diagnóstico)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = TMP_DIR / "profiles"
+
 if not APP_PASSWORD:
     # No rompemos el arranque, pero avisamos en consola.
     print("⚠️ APP_PASSWORD no está definido en .env (o no se cargó).")
\ No newline at end of file
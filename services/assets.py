@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+from pypdf import PageObject, PdfReader, PdfWriter
+from reportlab.lib.utils import ImageReader
+
+from .pdf_builder import prepare_logo
+from .result_cache import bytes_digest
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class TemplateAsset:
+    """Template PDF ya parseado: bytes originales + primera página (el “molde”) + sha256."""
+
+    pdf_bytes: bytes
+    page: PageObject
+    digest: str
+
+
+@dataclass(frozen=True)
+class LogoAsset:
+    """Logo default: bytes originales + imagen ya decodificada (None si no se pudo leer) + sha256."""
+
+    logo_bytes: bytes
+    image: Optional[ImageReader]
+    digest: str
+
+
+class _WatchedFile(Generic[T]):
+    """
+    Archivo cargado una vez y recargado solo si cambia mtime/tamaño.
+    La recarga reemplaza el valor de una sola vez bajo lock (igual que MatchTableCache).
+    """
+
+    def __init__(self, path: Path, loader: Callable[[bytes], T]):
+        self.path = Path(path)
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._sig: Optional[tuple[int, int]] = None
+        self._value: Optional[T] = None
+        self.loads = 0
+        self.last_load_ms = 0.0
+
+    def get(self) -> T:
+        st = os.stat(self.path)  # FileNotFoundError si no existe
+        sig = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            if self._sig == sig and self._value is not None:
+                return self._value
+
+            t0 = time.perf_counter()
+            value = self._loader(self.path.read_bytes())
+            self.last_load_ms = (time.perf_counter() - t0) * 1000.0
+            self.loads += 1
+            self._sig = sig
+            self._value = value
+
+            log.info("Asset %s cargado en %.1f ms (carga #%d)", self.path.name, self.last_load_ms, self.loads)
+            return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"path": str(self.path), "loads": self.loads, "last_load_ms": round(self.last_load_ms, 2)}
+
+
+def _load_template(pdf_bytes: bytes) -> TemplateAsset:
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    if len(reader.pages) < 1:
+        raise ValueError("El template PDF no tiene páginas.")
+    page = reader.pages[0]
+
+    # Copia descartable: resuelve todos los objetos indirectos de la página ahora,
+    # así después los threads solo leen del cache del reader (sin seek/read concurrente).
+    PdfWriter().add_page(page)
+
+    return TemplateAsset(pdf_bytes=pdf_bytes, page=page, digest=bytes_digest(pdf_bytes))
+
+
+def _load_logo(logo_bytes: bytes) -> LogoAsset:
+    return LogoAsset(logo_bytes=logo_bytes, image=prepare_logo(logo_bytes), digest=bytes_digest(logo_bytes))
+
+
+class AssetRegistry:
+    """
+    Assets estáticos del app (template PDF + logo default) parseados una sola vez.
+
+    Cada acceso hace solo un stat() para detectar cambios en disco (hot reload);
+    mientras el archivo no cambie no se vuelve a leer ni a parsear.
+    """
+
+    def __init__(self, template_path: Path, default_logo_path: Path):
+        self._template = _WatchedFile(template_path, _load_template)
+        self._logo = _WatchedFile(default_logo_path, _load_logo)
+
+    def template(self) -> TemplateAsset:
+        """Lanza FileNotFoundError si el template no existe."""
+        return self._template.get()
+
+    def default_logo(self) -> Optional[LogoAsset]:
+        """None si no hay logo default en disco."""
+        try:
+            return self._logo.get()
+        except FileNotFoundError:
+            return None
+
+    def preload(self) -> None:
+        """Carga todo al arrancar. Si falta algún archivo se avisa y se reintenta en el request."""
+        try:
+            self.template()
+        except Exception as e:
+            log.warning("No se pudo precargar el template PDF (%s): %s", self._template.path, e)
+        self.default_logo()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"template": self._template.stats(), "default_logo": self._logo.stats()}
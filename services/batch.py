@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from reportlab.lib.utils import ImageReader
+
+from .assets import AssetRegistry, TemplateAsset
+from .extract_items import extract_items_from_excel_bytes
+from .match_engine import configure_match_memo, enrich_items_with_match, load_match_table
+from .pdf_builder import prepare_logo, write_pdf_from_template
+from .profiling import trace
+from .utils import process_pool_context
+
+log = logging.getLogger(__name__)
+
+EXCEL_SUFFIXES = (".xlsx", ".xlsm")
+SUMMARY_NAME = "resumen.json"
+BATCH_ZIP_NAME = "desgloses.zip"  # nombre de descarga del lote
+
+
+@dataclass
+class BatchFileResult:
+    """Resultado de un Excel del lote (lo que va a resumen.json)."""
+
+    name: str
+    pdf_name: str = ""
+    items: int = 0
+    pages: int = 0
+    pdf_bytes: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)  # ms por etapa (services.profiling)
+    memo_hits: int = 0  # descripciones resueltas por el memo de match (sin puntuar)
+    memo_misses: int = 0
+    error: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class BatchSettings:
+    """Lo mismo para todos los archivos del lote (se manda una vez a cada proceso)."""
+
+    template_path: Path
+    default_logo_path: Path
+    match_path: Optional[Path]
+    fecha_ddmmyyyy: str
+    logo_bytes: Optional[bytes] = None
+    engine: str = "batch"
+    compose: str = "xobject"
+    threshold: float = 0.80
+    match_mode: str = "keyword"
+    memo_max_entries: int = 0  # memo de match por proceso (0 => desactivado)
+    memo_db: Optional[Path] = None  # SQLite compartido por los procesos del lote
+
+
+@dataclass
+class _BatchContext:
+    """Settings + assets ya parseados de un lote: uno por llamada a run_batch o por proceso del pool."""
+
+    settings: BatchSettings
+    template: TemplateAsset
+    logo_bytes: Optional[bytes]
+    logo_img: Optional[ImageReader]
+    match_path: Optional[str]
+    engine: str
+
+
+def _load_context(settings: BatchSettings) -> _BatchContext:
+    """Template, logo y match.xlsx se parsean una vez y se reusan para todos los archivos."""
+    assets = AssetRegistry(settings.template_path, settings.default_logo_path)
+    default_logo = assets.default_logo()
+
+    # Logo del lote: el subido (decodificado una vez) o el default
+    if settings.logo_bytes:
+        logo_bytes, logo_img = settings.logo_bytes, prepare_logo(settings.logo_bytes)
+    elif default_logo is not None:
+        logo_bytes, logo_img = default_logo.logo_bytes, default_logo.image
+    else:
+        logo_bytes, logo_img = None, None
+
+    configure_match_memo(settings.memo_max_entries, settings.memo_db)
+    match_path = str(settings.match_path) if settings.match_path and settings.match_path.exists() else None
+    if match_path:
+        table = load_match_table(match_path)
+        if settings.match_mode == "tfidf":
+            table.tfidf  # la matriz TF-IDF también se arma una sola vez
+
+    return _BatchContext(
+        settings=settings,
+        template=assets.template(),
+        logo_bytes=logo_bytes,
+        logo_img=logo_img,
+        match_path=match_path,
+        # "parallel" abriría un pool de procesos adentro de cada proceso del lote
+        engine="batch" if settings.engine == "parallel" else settings.engine,
+    )
+
+
+# Contexto de cada proceso del pool (lo arma _init_worker al arrancar el proceso). Solo se
+# usa adentro de los procesos del pool: en el proceso que llama a run_batch (p. ej. la app,
+# con varios lotes a la vez en distintos threads) cada lote lleva su propio _BatchContext.
+_WORKER_CONTEXT: Optional[_BatchContext] = None
+
+
+def _init_worker(settings: BatchSettings) -> None:
+    global _WORKER_CONTEXT
+    _WORKER_CONTEXT = _load_context(settings)
+
+
+def _process_file_in_worker(name: str, excel_bytes: bytes) -> Tuple[BatchFileResult, Optional[bytes]]:
+    return _process_file(_WORKER_CONTEXT, name, excel_bytes)
+
+
+def _process_file(ctx: _BatchContext, name: str, excel_bytes: bytes) -> Tuple[BatchFileResult, Optional[bytes]]:
+    """Excel -> ítems -> match -> PDF. Los errores quedan en el resultado (no cortan el lote)."""
+    settings = ctx.settings
+    result = BatchFileResult(name=name)
+    pdf = None
+
+    with trace(name) as tr:
+        try:
+            _, items = extract_items_from_excel_bytes(excel_bytes)
+            result.items = len(items)
+            if ctx.match_path:
+                memo_report: Dict[str, Any] = {}
+                enrich_items_with_match(
+                    items, ctx.match_path, settings.threshold, settings.match_mode, report=memo_report
+                )
+                result.memo_hits = memo_report.get("memo_hits", 0)
+                result.memo_misses = memo_report.get("memo_misses", 0)
+
+            out = io.BytesIO()
+            result.pages = write_pdf_from_template(
+                out,
+                template_pdf_bytes=ctx.template.pdf_bytes,
+                items=items,
+                fecha_ddmmyyyy=settings.fecha_ddmmyyyy,
+                logo_bytes=None,
+                default_logo_bytes=ctx.logo_bytes,
+                engine=ctx.engine,
+                template_page=ctx.template.page,
+                template_digest=ctx.template.digest,
+                default_logo_img=ctx.logo_img,
+                compose=settings.compose,
+            )
+            pdf = out.getvalue()
+            result.pdf_bytes = len(pdf)
+        except Exception as e:
+            result.error = str(e) or type(e).__name__
+    result.timings = tr.totals()
+    return result, pdf
+
+
+def _pdf_name(excel_name: str, used: set) -> str:
+    """<nombre del Excel>.pdf, sin repetir (dos Excel con el mismo nombre en carpetas distintas)."""
+    stem = PurePosixPath(excel_name).stem or "desglose"
+    name = f"{stem}.pdf"
+    n = 2
+    while name in used:
+        name = f"{stem} ({n}).pdf"
+        n += 1
+    used.add(name)
+    return name
+
+
+def iter_zip_workbooks(zip_bytes: bytes, max_files: int = 0, max_bytes: int = 0) -> Iterator[Tuple[str, bytes]]:
+    """
+    (nombre, bytes) de cada Excel dentro del ZIP (ignora carpetas, __MACOSX y archivos ~$ de bloqueo).
+
+    max_bytes: tope de lo que ocupan los Excel descomprimidos entre todos; se controla con
+    los tamaños declarados en el ZIP antes de descomprimir nada.
+    """
+    try:
+        zf = zipfile.ZipFile(io.BytesIO(zip_bytes))
+    except zipfile.BadZipFile:
+        raise ValueError("El archivo subido no es un ZIP válido.")
+
+    with zf:
+        infos = [
+            info for info in zf.infolist()
+            if not info.is_dir()
+            and info.filename.lower().endswith(EXCEL_SUFFIXES)
+            and not info.filename.startswith("__MACOSX/")
+            and not PurePosixPath(info.filename).name.startswith("~$")
+        ]
+        if not infos:
+            raise ValueError("El ZIP no tiene archivos Excel (.xlsx / .xlsm).")
+        if max_files and len(infos) > max_files:
+            raise ValueError(f"El ZIP tiene {len(infos)} archivos Excel (máximo {max_files}).")
+
+        infos.sort(key=lambda info: info.filename)
+        if max_bytes:
+            total = 0
+            for info in infos:
+                total += info.file_size
+                if total > max_bytes:
+                    raise ValueError(
+                        f"Los Excel del ZIP ocupan más de {max_bytes / (1024 * 1024):.0f} MB descomprimidos."
+                    )
+        for info in infos:
+            try:
+                # Se lee hasta un byte más de lo declarado: si sobra, el tamaño del ZIP miente
+                with zf.open(info) as f:
+                    data = f.read(info.file_size + 1)
+            except (zipfile.BadZipFile, EOFError):
+                data = None
+            if data is None or len(data) > info.file_size:
+                raise ValueError(f"El archivo {info.filename} del ZIP está dañado.")
+            yield info.filename, data
+
+
+def iter_dir_workbooks(directory: Path) -> Iterator[Tuple[str, bytes]]:
+    """(ruta relativa, bytes) de cada Excel de la carpeta (recursivo)."""
+    directory = Path(directory)
+    for path in sorted(directory.rglob("*")):
+        if path.is_file() and path.suffix.lower() in EXCEL_SUFFIXES and not path.name.startswith("~$"):
+            yield path.relative_to(directory).as_posix(), path.read_bytes()
+
+
+def run_batch(
+    files: Iterable[Tuple[str, bytes]],
+    settings: BatchSettings,
+    out_zip: BinaryIO,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> List[BatchFileResult]:
+    """
+    Genera un PDF por Excel y los escribe en `out_zip` (ZIP abierto en "wb"), junto con
+    resumen.json (ítems, páginas, tiempos y error de cada archivo, en el orden de entrada).
+
+    Los archivos se reparten en un ProcessPoolExecutor de `workers` procesos (default
+    cpu_count); cada proceso parsea template / logo / match.xlsx una sola vez. Con
+    workers=1 todo corre en este proceso. Un Excel con error no corta el lote.
+
+    progress: si viene, se llama con la cantidad de archivos ya terminados.
+    """
+    files = list(files)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files) or 1))
+    results: List[Optional[BatchFileResult]] = [None] * len(files)
+    used_names: set = set()
+
+    with zipfile.ZipFile(out_zip, "w", compression=zipfile.ZIP_STORED) as zf:
+        # PDFs ya comprimidos (FlateDecode): ZIP_STORED, sin recomprimir
+
+        def _store(pos: int, result: BatchFileResult, pdf: Optional[bytes]) -> None:
+            if pdf is not None:
+                result.pdf_name = _pdf_name(result.name, used_names)
+                zf.writestr(result.pdf_name, pdf)
+            else:
+                log.warning("Lote: %s falló: %s", result.name, result.error)
+            results[pos] = result
+            if progress is not None:
+                progress(sum(1 for r in results if r is not None))
+
+        if workers == 1:
+            ctx = _load_context(settings)
+            for pos, (name, data) in enumerate(files):
+                _store(pos, *_process_file(ctx, name, data))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=process_pool_context(),
+                initializer=_init_worker,
+                initargs=(settings,),
+            ) as ex:
+                futures = {
+                    ex.submit(_process_file_in_worker, name, data): pos for pos, (name, data) in enumerate(files)
+                }
+                for fut in as_completed(futures):
+                    pos = futures[fut]
+                    try:
+                        _store(pos, *fut.result())
+                    except Exception as e:
+                        # El proceso murió (memoria, etc.): el archivo queda con error
+                        _store(pos, BatchFileResult(name=files[pos][0], error=f"worker: {e}"), None)
+
+        summary = [r.to_dict() for r in results if r is not None]
+        zf.writestr(SUMMARY_NAME, json.dumps(summary, ensure_ascii=False, indent=2))
+
+    ok = sum(1 for r in results if r is not None and not r.error)
+    log.info("Lote: %d/%d archivos generados (%d procesos)", ok, len(files), workers)
+    return [r for r in results if r is not None]
@@ -1,87 +1,331 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Sequence
 
+import numpy as np
+
+from .item_table import Items, ItemTable
+from .profiling import span
 from .utils import safe_int
 
 
-def build_cpu_pages(items: List[Dict[str, Any]], fecha_str: str) -> List[Dict[str, Any]]:
+def _cpu_dict(
+    fecha_str: str,
+    nro: int,
+    desc: str,
+    unidad: str,
+    cantidad: float,
+    herramientas: str,
+    materiales: str,
+    b_mano_obra: int,
+    costo_unitario_adoptado: int,
+) -> Dict[str, Any]:
+    # --- CPU mínimo coherente ---
+    return {
+        "fecha": fecha_str,
+        "item_nro": nro,
+        "descripcion": desc,
+        "unidad_medida": unidad,
+        "raw_qty": cantidad,
+
+        # A - Herramientas
+        "a_herramientas": herramientas,
+        "a_modelo": "",
+        "a_horas": 0,
+        "a_costo_horario": 0,
+        "a_total": 0,
+
+        # B - Mano de obra
+        "b_no_aplica": True if b_mano_obra == 0 else False,
+        "b_total": b_mano_obra,
+
+        # C / D (simple)
+        "c_produccion": 1,
+        "costo_produccion_ab": 0,
+        "d_costo_unitario_ejecucion": 0,
+
+        # E - Materiales (texto)
+        "is_labor": False,
+        "e_rows": [],
+        "e_total": 0,
+        "a_materiales": materiales,  # para usarlo en el PDF
+
+        # F - Transporte
+        "f_dtm": 0.00,
+        "f_consumo": 0.05,
+        "f_costo_unit": 10000,
+        "f_total": 0,
+
+        # Totales (si no calculás todavía, dejás 0)
+        "costo_directo_total": 0,
+        "gastos_generales": 0,
+        "impuestos_retenciones": 0,
+        "costo_unitario_total": 0,
+        "iva": 0,
+        "costo_unitario_adoptado": costo_unitario_adoptado,
+    }
+
+
+# Campos que hoy valen lo mismo en todos los CPUs (un solo valor para todo el batch)
+CPU_CONSTANTS: Dict[str, Any] = {
+    "a_modelo": "",
+    "a_horas": 0,
+    "a_costo_horario": 0,
+    "a_total": 0,
+    "c_produccion": 1,
+    "costo_produccion_ab": 0,
+    "d_costo_unitario_ejecucion": 0,
+    "is_labor": False,
+    "e_total": 0,
+    "f_dtm": 0.00,
+    "f_consumo": 0.05,
+    "f_costo_unit": 10000,
+}
+
+# Totales que todavía no se calculan (0 en todos los ítems)
+_ZERO_TOTALS = (
+    "f_total",
+    "costo_directo_total",
+    "gastos_generales",
+    "impuestos_retenciones",
+    "costo_unitario_total",
+    "iva",
+)
+
+_DEFAULT_HERRAMIENTAS = "herramientas de mano"
+_DEFAULT_MATERIALES = "consumibles varios"
+
+# Mismo orden de claves que _cpu_dict
+CPU_KEYS = tuple(_cpu_dict("", 0, "", "", 1.0, "", "", 0, 0))
+
+
+class CpuBatch:
+    """
+    CPUs de todos los ítems en columnas de NumPy (en vez de 1 dict de ~30 claves por ítem).
+
+    `arrays` tiene una columna por campo numérico que varía entre ítems; los campos fijos
+    están en CPU_CONSTANTS y los totales en 0 comparten un único array de solo lectura.
+    `batch[i]` devuelve un CpuView que se comporta como el dict de build_cpu_pages.
+    """
+
+    def __init__(
+        self,
+        fecha: str,
+        descripcion: Sequence[str],
+        unidad_medida: Sequence[str],
+        a_herramientas: Sequence[str],
+        a_materiales: Sequence[str],
+        arrays: Dict[str, np.ndarray],
+    ):
+        self.fecha = fecha
+        self.descripcion = descripcion
+        self.unidad_medida = unidad_medida
+        self.a_herramientas = a_herramientas
+        self.a_materiales = a_materiales
+        self.arrays = arrays
+
+    def __len__(self) -> int:
+        return len(self.arrays["item_nro"])
+
+    def __getitem__(self, i: int) -> "CpuView":
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("CpuBatch index out of range")
+        return CpuView(self, i)
+
+    def __iter__(self) -> Iterator["CpuView"]:
+        for i in range(len(self)):
+            yield CpuView(self, i)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        # tolist() pasa cada columna a escalares de Python de una vez
+        nro = self.arrays["item_nro"].tolist()
+        qty = self.arrays["raw_qty"].tolist()
+        b_total = self.arrays["b_total"].tolist()
+        adoptado = self.arrays["costo_unitario_adoptado"].tolist()
+
+        return [
+            _cpu_dict(
+                fecha_str=self.fecha,
+                nro=nro[i],
+                desc=self.descripcion[i],
+                unidad=self.unidad_medida[i],
+                cantidad=qty[i],
+                herramientas=self.a_herramientas[i],
+                materiales=self.a_materiales[i],
+                b_mano_obra=b_total[i],
+                costo_unitario_adoptado=adoptado[i],
+            )
+            for i in range(len(nro))
+        ]
+
+    def __repr__(self) -> str:
+        return f"<CpuBatch {len(self)} CPUs, fecha={self.fecha!r}>"
+
+
+class CpuView(Mapping):
+    """Vista tipo dict (solo lectura) del CPU `i` de un CpuBatch."""
+
+    __slots__ = ("_batch", "_i")
+
+    def __init__(self, batch: CpuBatch, i: int):
+        self._batch = batch
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        b = self._batch
+        if key in CPU_CONSTANTS:
+            return CPU_CONSTANTS[key]
+        if key in b.arrays:
+            return b.arrays[key][self._i].item()
+        if key == "fecha":
+            return b.fecha
+        if key == "descripcion":
+            return b.descripcion[self._i]
+        if key == "unidad_medida":
+            return b.unidad_medida[self._i]
+        if key == "a_herramientas":
+            return b.a_herramientas[self._i]
+        if key == "a_materiales":
+            return b.a_materiales[self._i]
+        if key == "b_no_aplica":
+            return bool(b.arrays["b_total"][self._i] == 0)
+        if key == "e_rows":
+            return []
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CPU_KEYS)
+
+    def __len__(self) -> int:
+        return len(CPU_KEYS)
+
+    def __repr__(self) -> str:
+        return f"CpuView({dict(self)!r})"
+
+
+def _int_column(values: List[Any]) -> np.ndarray:
+    return np.fromiter((safe_int(v) for v in values), dtype=np.int64, count=len(values))
+
+
+def _text_column(items: ItemTable, col: Optional[List[str]], key: str, default: str) -> List[str]:
+    """Columna de texto del match; celdas sin completar (o tabla sin anotar): el default o lo seteado a mano."""
+    if col is not None:
+        return col if None not in col else [default if v is None else v for v in col]
+    if not items._extra:
+        return [default] * len(items)
+    out = [default] * len(items)
+    for i, extra in items._extra.items():
+        if key in extra:
+            out[i] = extra[key]
+    return out
+
+
+def cost_items(items: Items, fecha_str: str) -> CpuBatch:
+    """
+    Costeo vectorizado: todos los CPUs de una vez, en columnas (ver CpuBatch).
+
+    Mismos valores que build_cpu_pages, pero sin armar un dict por ítem ni mutar `items`.
+    Con un ItemTable las columnas numéricas se leen sin copiar (np.frombuffer).
+    """
+    with span("cost_items"):
+        n = len(items)
+
+        if isinstance(items, ItemTable):
+            nro = np.frombuffer(items.nro, dtype=np.int64, count=n)
+            cantidad = np.frombuffer(items.cantidad, dtype=np.float64, count=n)
+            descripcion: Sequence[str] = items.descripcion
+            unidad: Sequence[str] = items.unidad
+            herramientas = _text_column(items, items.a_herramientas, "a_herramientas", _DEFAULT_HERRAMIENTAS)
+            materiales = _text_column(items, items.a_materiales, "a_materiales", _DEFAULT_MATERIALES)
+
+            # precio_total_iva / b_mano_obra no son columnas: solo existen si alguien los seteó
+            precio_total_iva = np.zeros(n, dtype=np.int64)
+            b_mano_obra = np.zeros(n, dtype=np.int64)
+            for i, extra in (items._extra or {}).items():
+                precio_total_iva[i] = safe_int(extra.get("precio_total_iva", 0))
+                b_mano_obra[i] = safe_int(extra.get("b_mano_obra", 0))
+        else:
+            nro = _int_column([it.get("nro", 0) for it in items])
+            cantidad = np.array([float(it.get("cantidad", 1.0) or 1.0) for it in items], dtype=np.float64)
+            descripcion = [str(it.get("descripcion", "") or "") for it in items]
+            unidad = [str(it.get("unidad", "") or "") for it in items]
+            herramientas = [it.get("a_herramientas", _DEFAULT_HERRAMIENTAS) for it in items]
+            materiales = [it.get("a_materiales", _DEFAULT_MATERIALES) for it in items]
+            precio_total_iva = _int_column([it.get("precio_total_iva", 0) for it in items])
+            b_mano_obra = _int_column([it.get("b_mano_obra", 0) for it in items])
+
+        # unitario = total / cantidad (cantidad <= 0 => 1); np.rint redondea igual que round()
+        cantidad = np.where(cantidad > 0, cantidad, 1.0)
+        costo_unitario_adoptado = np.rint(precio_total_iva / cantidad).astype(np.int64)
+
+        zeros = np.zeros(n, dtype=np.int64)
+        zeros.flags.writeable = False
+
+        arrays: Dict[str, np.ndarray] = {
+            "item_nro": nro,
+            "raw_qty": cantidad,
+            "b_total": b_mano_obra,
+            "costo_unitario_adoptado": costo_unitario_adoptado,
+        }
+        arrays.update((k, zeros) for k in _ZERO_TOTALS)
+        return CpuBatch(fecha_str, descripcion, unidad, herramientas, materiales, arrays)
+
+
+def build_cpu_pages(items: Items, fecha_str: str) -> List[Dict[str, Any]]:
     """
     Convierte items (Excel + Match) en CPUs completos para el PDF.
 
     Claves esperadas del item:
       - nro, descripcion, unidad, cantidad, precio_total_iva
       - a_herramientas, a_materiales (vienen de match_engine)
+
+    Con un ItemTable se costea en batch (cost_items); con una lista de dicts se
+    completan en el lugar las claves faltantes (como siempre).
     """
-    cpus: List[Dict[str, Any]] = []
-
-    for it in items:
-        # ✅ Normalización obligatoria (acá se arreglan los KeyError)
-        it.setdefault("a_herramientas", "herramientas de mano")
-        it.setdefault("a_materiales", "consumibles varios")
-        it.setdefault("b_mano_obra", 0)  # si no calculás MO todavía, dejalo en 0
-
-        nro = safe_int(it.get("nro", 0))
-        desc = str(it.get("descripcion", "") or "")
-        unidad = str(it.get("unidad", "") or "")
-        cantidad = float(it.get("cantidad", 1.0) or 1.0)
-        precio_total_iva = safe_int(it.get("precio_total_iva", 0))
-
-        # Si tu precio_total_iva ya es el total por la cantidad, el unitario adoptado es:
-        # unitario = total / cantidad
-        if cantidad <= 0:
-            cantidad = 1.0
-
-        costo_unitario_adoptado = int(round(precio_total_iva / cantidad))
-
-        # --- CPU mínimo coherente ---
-        cpu: Dict[str, Any] = {
-            "fecha": fecha_str,
-            "item_nro": nro,
-            "descripcion": desc,
-            "unidad_medida": unidad,
-            "raw_qty": cantidad,
+    with span("costing"):
+        if isinstance(items, ItemTable):
+            return cost_items(items, fecha_str).to_dicts()
 
-            # A - Herramientas
-            "a_herramientas": it["a_herramientas"],
-            "a_modelo": "",
-            "a_horas": 0,
-            "a_costo_horario": 0,
-            "a_total": 0,
-
-            # B - Mano de obra
-            "b_no_aplica": True if safe_int(it.get("b_mano_obra", 0)) == 0 else False,
-            "b_total": safe_int(it.get("b_mano_obra", 0)),
-
-            # C / D (simple)
-            "c_produccion": 1,
-            "costo_produccion_ab": 0,
-            "d_costo_unitario_ejecucion": 0,
-
-            # E - Materiales (texto)
-            "is_labor": False,
-            "e_rows": [],
-            "e_total": 0,
-            "a_materiales": it["a_materiales"],  # para usarlo en el PDF
-
-            # F - Transporte
-            "f_dtm": 0.00,
-            "f_consumo": 0.05,
-            "f_costo_unit": 10000,
-            "f_total": 0,
-
-            # Totales (si no calculás todavía, dejás 0)
-            "costo_directo_total": 0,
-            "gastos_generales": 0,
-            "impuestos_retenciones": 0,
-            "costo_unitario_total": 0,
-            "iva": 0,
-            "costo_unitario_adoptado": costo_unitario_adoptado,
-        }
+        cpus: List[Dict[str, Any]] = []
+
+        for it in items:
+            # ✅ Normalización obligatoria (acá se arreglan los KeyError)
+            it.setdefault("a_herramientas", _DEFAULT_HERRAMIENTAS)
+            it.setdefault("a_materiales", _DEFAULT_MATERIALES)
+            it.setdefault("b_mano_obra", 0)  # si no calculás MO todavía, dejalo en 0
+
+            nro = safe_int(it.get("nro", 0))
+            desc = str(it.get("descripcion", "") or "")
+            unidad = str(it.get("unidad", "") or "")
+            cantidad = float(it.get("cantidad", 1.0) or 1.0)
+            precio_total_iva = safe_int(it.get("precio_total_iva", 0))
+
+            # Si tu precio_total_iva ya es el total por la cantidad, el unitario adoptado es:
+            # unitario = total / cantidad
+            if cantidad <= 0:
+                cantidad = 1.0
+
+            costo_unitario_adoptado = int(round(precio_total_iva / cantidad))
+
+            cpu = _cpu_dict(
+                fecha_str=fecha_str,
+                nro=nro,
+                desc=desc,
+                unidad=unidad,
+                cantidad=cantidad,
+                herramientas=it["a_herramientas"],
+                materiales=it["a_materiales"],
+                b_mano_obra=safe_int(it.get("b_mano_obra", 0)),
+                costo_unitario_adoptado=costo_unitario_adoptado,
+            )
 
-        # Si querés que “costo_unitario_adoptado” sea exactamente el precio_total_iva:
-        # cpu["costo_unitario_adoptado"] = precio_total_iva
+            # Si querés que “costo_unitario_adoptado” sea exactamente el precio_total_iva:
+            # cpu["costo_unitario_adoptado"] = precio_total_iva
 
-        cpus.append(cpu)
+            cpus.append(cpu)
 
-    return cpus
\ No newline at end of file
+        return cpus
\ No newline at end of file
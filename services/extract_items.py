@@ -1,14 +1,20 @@
 from __future__ import annotations
 
 import io
-import math
-import re
-import unicodedata
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import openpyxl
 
+from .item_table import ItemTable
+from .num_parse import parse_numbers
+from .profiling import span
+from .text_norm import norm_text
+
+log = logging.getLogger(__name__)
+
 
 @dataclass
 class ItemRow:
@@ -19,72 +25,8 @@ class ItemRow:
     precio_total: int  # entero
 
 
-def _norm(s: Any) -> str:
-    """Normaliza: lower, sin acentos, solo alfanum + espacio."""
-    if s is None:
-        return ""
-    s = str(s).strip().lower()
-    s = unicodedata.normalize("NFD", s)
-    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
-    s = re.sub(r"[^a-z0-9]+", " ", s).strip()
-    s = re.sub(r"\s+", " ", s)
-    return s
-
-
-def _to_float(v: Any) -> Optional[float]:
-    if v is None:
-        return None
-    if isinstance(v, (int, float)):
-        if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
-            return None
-        return float(v)
-
-    s = str(v).strip()
-    if not s:
-        return None
-
-    s = s.replace("\u00a0", " ").strip()
-    s = s.replace("Gs.", "").replace("Gs", "").strip()
-
-    # manejo separadores
-    if "," in s and "." in s:
-        last_comma = s.rfind(",")
-        last_dot = s.rfind(".")
-        if last_comma > last_dot:
-            s = s.replace(".", "")
-            s = s.replace(",", ".")
-        else:
-            s = s.replace(",", "")
-    else:
-        if "," in s:
-            parts = s.split(",")
-            if len(parts) == 2 and len(parts[1]) in (1, 2):
-                s = parts[0].replace(".", "").replace(",", "") + "." + parts[1]
-            else:
-                s = s.replace(",", "")
-        if "." in s:
-            parts = s.split(".")
-            if not (len(parts) == 2 and len(parts[1]) in (1, 2)):
-                s = s.replace(".", "")
-
-    s = re.sub(r"[^\d\.\-]", "", s)
-    if not s or s in ("-", ".", "-."):
-        return None
-    try:
-        return float(s)
-    except ValueError:
-        return None
-
-
-def _to_int(v: Any) -> Optional[int]:
-    f = _to_float(v)
-    if f is None:
-        return None
-    return int(round(f))
-
-
-def _find_header_row(ws, max_scan_rows: int = 80) -> Optional[Tuple[int, Dict[str, int]]]:
-    DESC_KEYS = {
+_HEADER_KEYS: Dict[str, set[str]] = {
+    "descripcion": {
         "descripcion",
         "descripciones",
         "descripcion del bien",
@@ -92,8 +34,8 @@ def _find_header_row(ws, max_scan_rows: int = 80) -> Optional[Tuple[int, Dict[st
         "descripcion del ítem",
         "descripcion item",
         "desc",
-    }
-    TOTAL_KEYS = {
+    },
+    "precio_total": {
         "precio total",
         "precios totales",
         "precio total iva incluido",
@@ -105,120 +47,271 @@ def _find_header_row(ws, max_scan_rows: int = 80) -> Optional[Tuple[int, Dict[st
         "totales",
         "importe total",
         "monto total",
-    }
-    QTY_KEYS = {"cantidad", "cant", "qty"}
-    UNIT_KEYS = {"unidad", "unidad de medida", "u m", "um", "medida"}
-    NRO_KEYS = {"item", "items", "nro", "no", "numero", "n", "n item"}
-
-    def find_any(norm_headers: List[str], keys: set[str]) -> Optional[int]:
-        for idx, h in enumerate(norm_headers, start=1):
-            if h in keys:
-                return idx
-        return None
+    },
+    "cantidad": {"cantidad", "cant", "qty"},
+    "unidad": {"unidad", "unidad de medida", "u m", "um", "medida"},
+    "nro": {"item", "items", "nro", "no", "numero", "n", "n item"},
+}
+
+# Variantes "fuzzy" que aparecen en planillas reales (se agregan a las de arriba)
+_HEADER_FUZZY: Dict[str, set[str]] = {
+    "descripcion": {
+        "descripcion de los bienes",
+        "descripcion de bienes",
+        "descripcion del servicio",
+        "descripcion de los items",
+        "descripcion del producto",
+    },
+    "precio_total": {"monto total iva incluido", "importe total iva incluido", "total iva incluido"},
+    "cantidad": {"cantidades", "cant solicitada"},
+    "unidad": {"unidades", "unid", "u medida", "unidad medida"},
+    "nro": {"nro item", "item n", "item nro", "numero de item", "no item"},
+}
+_CURRENCY_SUFFIXES = ("gs", "en gs", "guaranies", "en guaranies")
+
+
+def _build_header_lookup() -> Dict[str, str]:
+    """Encabezado normalizado -> campo del col_map, precalculado una vez."""
+    lookup: Dict[str, str] = {}
+    for field, keys in _HEADER_KEYS.items():
+        variants = {norm_text(k) for k in keys | _HEADER_FUZZY[field]}
+        if field == "precio_total":
+            variants |= {f"{k} {suf}" for k in variants for suf in _CURRENCY_SUFFIXES}
+        for k in variants:
+            lookup.setdefault(k, field)
+    return lookup
+
+
+_HEADER_LOOKUP = _build_header_lookup()
 
-    for r in range(1, min(max_scan_rows, ws.max_row) + 1):
-        values = [ws.cell(row=r, column=c).value for c in range(1, ws.max_column + 1)]
-        norm_headers = [_norm(v) for v in values]
 
-        desc_col = find_any(norm_headers, DESC_KEYS)
-        total_col = find_any(norm_headers, TOTAL_KEYS)
-        if not desc_col or not total_col:
-            continue
-
-        col_map: Dict[str, int] = {
-            "descripcion": desc_col,
-            "precio_total": total_col,
-        }
-        nro_col = find_any(norm_headers, NRO_KEYS)
-        qty_col = find_any(norm_headers, QTY_KEYS)
-        unit_col = find_any(norm_headers, UNIT_KEYS)
-
-        if nro_col:
-            col_map["nro"] = nro_col
-        if qty_col:
-            col_map["cantidad"] = qty_col
-        if unit_col:
-            col_map["unidad"] = unit_col
-
-        return r, col_map
+@dataclass
+class HeaderDetection:
+    """Qué encabezado se eligió y cuánto costó encontrarlo (para loguear por upload)."""
+
+    sheet: str
+    row: int
+    col_map: Dict[str, int]
+    rows_scanned: int
+    cells_scanned: int
+    distinct_values: int
+    elapsed_ms: float
+
+
+def _trim_row(values: Tuple[Any, ...]) -> Tuple[Any, ...]:
+    """Saca las celdas vacías del final (hojas con formato “fantasma” hasta la columna XFD)."""
+    n = len(values)
+    while n and values[n - 1] is None:
+        n -= 1
+    return values[:n]
+
+
+def detect_header(ws, max_scan_rows: int = 80) -> Optional[HeaderDetection]:
+    """
+    Busca la fila de encabezados en las primeras `max_scan_rows` filas, en una sola
+    pasada de iter_rows. Cada valor distinto se normaliza una vez y se busca en
+    `_HEADER_LOOKUP`; por campo se queda con la primera columna que coincide.
+    La fila vale si tiene descripción y precio total.
+    """
+    t0 = time.perf_counter()
+    norm_memo: Dict[str, str] = {}
+    cells = 0
+
+    for r, values in enumerate(ws.iter_rows(max_row=max_scan_rows, values_only=True), start=1):
+        values = _trim_row(values)
+        cells += len(values)
+
+        col_map: Dict[str, int] = {}
+        for idx, v in enumerate(values, start=1):
+            if v is None:
+                continue
+            if isinstance(v, str):
+                h = norm_memo.get(v)
+                if h is None:
+                    h = norm_memo[v] = norm_text(v)
+            else:
+                h = norm_text(v)
+
+            field = _HEADER_LOOKUP.get(h)
+            if field is not None and field not in col_map:
+                col_map[field] = idx
+
+        if "descripcion" in col_map and "precio_total" in col_map:
+            return HeaderDetection(
+                sheet=ws.title,
+                row=r,
+                col_map=col_map,
+                rows_scanned=r,
+                cells_scanned=cells,
+                distinct_values=len(norm_memo),
+                elapsed_ms=(time.perf_counter() - t0) * 1000.0,
+            )
 
     return None
 
 
-def extract_items_from_excel_bytes(excel_bytes: bytes) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
-    wb = openpyxl.load_workbook(io.BytesIO(excel_bytes), data_only=True)
+def _find_header_row(ws, max_scan_rows: int = 80) -> Optional[Tuple[int, Dict[str, int]]]:
+    det = detect_header(ws, max_scan_rows=max_scan_rows)
+    if det is None:
+        return None
+    return det.row, det.col_map
 
-    meta: Dict[str, Any] = {}
-    out: List[ItemRow] = []
 
-    for ws in wb.worksheets:
-        found = _find_header_row(ws)
-        if not found:
-            continue
+_NO_COLUMNS_MSG = (
+    "No se encontraron columnas clave.\n"
+    "Se aceptan encabezados tipo:\n"
+    "- Descripción / Descripciones / Descripción del Bien / Descripción del item\n"
+    "- Precio total / Precios totales / Total / Precio total IVA incluido\n"
+    "(ignorando acentos y mayúsculas)."
+)
+
 
-        header_row, cols = found
-        nro_auto = 1
+def _cell(row: Tuple[Any, ...], col: int) -> Any:
+    """Valor de la columna `col` (1-based) de una fila de `iter_rows(values_only=True)`."""
+    if 0 < col <= len(row):
+        return row[col - 1]
+    return None
 
-        for r in range(header_row + 1, ws.max_row + 1):
-            desc_val = ws.cell(row=r, column=cols["descripcion"]).value
-            total_val = ws.cell(row=r, column=cols["precio_total"]).value
 
+_ROW_BLOCK = 1024  # filas por bloque: las columnas numéricas se parsean en batch por bloque
+
+
+def _row_blocks(rows: Iterator[Tuple[Any, ...]], size: int) -> Iterator[List[Tuple[Any, ...]]]:
+    block: List[Tuple[Any, ...]] = []
+    for row in rows:
+        block.append(row)
+        if len(block) >= size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def _iter_sheet_items(ws, header_row: int, cols: Dict[str, int]) -> Iterator[ItemRow]:
+    """
+    Recorre las filas debajo del encabezado en una sola pasada.
+    Solo se leen columnas hasta la última del `col_map` (no todo el ancho de la hoja),
+    y de a bloques de `_ROW_BLOCK` filas para parsear las columnas numéricas en batch
+    (la memoria sigue acotada al bloque).
+    """
+    nro_auto = 1
+    c_desc = cols["descripcion"]
+    c_total = cols["precio_total"]
+    c_nro = cols.get("nro")
+    c_unit = cols.get("unidad")
+    c_qty = cols.get("cantidad")
+
+    rows = ws.iter_rows(min_row=header_row + 1, max_col=max(cols.values()), values_only=True)
+    for block in _row_blocks(rows, _ROW_BLOCK):
+        totals = parse_numbers([_cell(row, c_total) for row in block])
+        nros = parse_numbers([_cell(row, c_nro) for row in block]) if c_nro else None
+        qtys = parse_numbers([_cell(row, c_qty) for row in block]) if c_qty else None
+
+        for i, row in enumerate(block):
+            desc_val = _cell(row, c_desc)
             desc = (str(desc_val).strip() if desc_val is not None else "").strip()
-            total_int = _to_int(total_val)
+            total = totals[i]
 
-            if not desc and total_int is None:
+            if not desc and total is None:
                 continue
-            if not desc or total_int is None:
+            if not desc or total is None:
                 continue
 
-            nro_val = ws.cell(row=r, column=cols.get("nro", 0)).value if "nro" in cols else None
-            nro_int = _to_int(nro_val) if nro_val is not None else None
-            if nro_int is None:
-                nro_int = nro_auto
+            nro = nros[i] if nros is not None else None
+            nro_int = int(round(nro)) if nro is not None else nro_auto
             nro_auto += 1
 
             unidad = ""
-            if "unidad" in cols:
-                u = ws.cell(row=r, column=cols["unidad"]).value
+            if c_unit:
+                u = _cell(row, c_unit)
                 unidad = (str(u).strip() if u is not None else "").strip()
 
             cantidad = 1.0
-            if "cantidad" in cols:
-                q = _to_float(ws.cell(row=r, column=cols["cantidad"]).value)
+            if qtys is not None:
+                q = qtys[i]
                 if q is not None and q > 0:
                     cantidad = float(q)
 
-            out.append(
-                ItemRow(
-                    nro=int(nro_int),
-                    descripcion=desc,
-                    unidad=unidad,
-                    cantidad=cantidad,
-                    precio_total=int(total_int),
-                )
+            yield ItemRow(
+                nro=int(nro_int),
+                descripcion=desc,
+                unidad=unidad,
+                cantidad=cantidad,
+                precio_total=int(round(total)),
             )
 
-        if out:
-            break
 
-    if not out:
-        raise ValueError(
-            "No se encontraron columnas clave.\n"
-            "Se aceptan encabezados tipo:\n"
-            "- Descripción / Descripciones / Descripción del Bien / Descripción del item\n"
-            "- Precio total / Precios totales / Total / Precio total IVA incluido\n"
-            "(ignorando acentos y mayúsculas)."
-        )
+def iter_item_rows(
+    excel_bytes: bytes,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Iterator[ItemRow]:
+    """
+    Versión streaming: abre el libro en modo read-only y va entregando ItemRow
+    a medida que se leen, sin cargar la hoja completa en memoria.
+
+    Igual que antes, se usa la primera hoja que tenga encabezados válidos y al menos un ítem.
+    Lanza ValueError si no se encontró ninguno.
+
+    Si se pasa `meta`, se completa meta["header"] con la hoja/fila/columnas elegidas.
+    """
+    with span("excel_load"):
+        wb = openpyxl.load_workbook(io.BytesIO(excel_bytes), read_only=True, data_only=True)
+    found_any = False
+
+    try:
+        for ws in wb.worksheets:
+            # En read-only las dimensiones salen del XML y algunos generadores las graban mal.
+            ws.reset_dimensions()
+
+            with span("header_detect"):
+                det = detect_header(ws)
+            if det is None:
+                continue
 
-    items = [
-        {
+            log.info(
+                "Encabezado: hoja=%r fila=%d columnas=%s (%d filas, %d celdas, %d valores, %.1f ms)",
+                det.sheet, det.row, det.col_map, det.rows_scanned,
+                det.cells_scanned, det.distinct_values, det.elapsed_ms,
+            )
+            if meta is not None:
+                meta["header"] = asdict(det)
+
+            with span("rows"):
+                for it in _iter_sheet_items(ws, det.row, det.col_map):
+                    found_any = True
+                    yield it
+
+            if found_any:
+                break
+    finally:
+        wb.close()
+
+    if not found_any:
+        raise ValueError(_NO_COLUMNS_MSG)
+
+
+def iter_items_from_excel_bytes(
+    excel_bytes: bytes,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Como iter_item_rows, pero entrega cada ítem como dict (formato anterior)."""
+    for it in iter_item_rows(excel_bytes, meta=meta):
+        yield {
             "nro": it.nro,
             "descripcion": it.descripcion,
             "unidad": it.unidad,
             "cantidad": it.cantidad,
             "precio_total": it.precio_total,
         }
-        for it in out
-    ]
 
-    return meta, items
\ No newline at end of file
+
+def extract_items_from_excel_bytes(excel_bytes: bytes) -> Tuple[Dict[str, Any], ItemTable]:
+    """
+    Ítems del Excel como ItemTable (columnas). `items[i]` / iterar dan vistas tipo dict
+    con las mismas claves que antes; `items.to_dicts()` da la lista de dicts.
+    """
+    meta: Dict[str, Any] = {}
+    items = ItemTable()
+    for it in iter_item_rows(excel_bytes, meta=meta):
+        items.append_row(it)
+    return meta, items
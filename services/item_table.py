@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import math
+from array import array
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+from .num_parse import parse_ints, parse_numbers
+
+BASE_COLUMNS = ("nro", "descripcion", "unidad", "cantidad", "precio_total")
+MATCH_COLUMNS = ("a_herramientas", "a_materiales", "match_score", "match_desc")
+_UNSET_SCORE = math.nan  # match_score de una fila sin match (las columnas de texto usan None)
+
+
+class ItemTable:
+    """
+    Ítems del Excel en columnas (en vez de 1 dict por ítem).
+
+    Numéricos en `array` (8 bytes por valor), textos en listas. Las columnas del match
+    (`a_herramientas`, `a_materiales`, `match_score`, `match_desc`) aparecen recién cuando
+    match_engine anota la tabla; una celda que nadie completó (None / NaN) es como la clave
+    ausente en el dict de antes. `table[i]` devuelve un ItemView que se comporta como ese
+    dict, para el código que todavía trabaja con dicts.
+    """
+
+    __slots__ = BASE_COLUMNS + MATCH_COLUMNS + ("_extra",)
+
+    def __init__(self) -> None:
+        self.nro = array("q")
+        self.descripcion: List[str] = []
+        self.unidad: List[str] = []
+        self.cantidad = array("d")
+        self.precio_total = array("q")
+
+        self.a_herramientas: Optional[List[str]] = None
+        self.a_materiales: Optional[List[str]] = None
+        self.match_score: Optional[array] = None
+        self.match_desc: Optional[List[str]] = None
+
+        # Claves sueltas que alguien setea vía ItemView (compatibilidad); fila -> dict
+        self._extra: Optional[Dict[int, Dict[str, Any]]] = None
+
+    # ---- construcción ----
+    def append(self, nro: int, descripcion: str, unidad: str, cantidad: float, precio_total: int) -> None:
+        if self.a_herramientas is not None:
+            raise ValueError("No se pueden agregar filas a una tabla ya anotada con el match.")
+        self.nro.append(nro)
+        self.descripcion.append(descripcion)
+        self.unidad.append(unidad)
+        self.cantidad.append(cantidad)
+        self.precio_total.append(precio_total)
+
+    def append_row(self, row: Any) -> None:
+        """Agrega un ItemRow (o cualquier objeto con los mismos atributos)."""
+        self.append(row.nro, row.descripcion, row.unidad, row.cantidad, row.precio_total)
+
+    @classmethod
+    def from_dicts(cls, items: Sequence[Dict[str, Any]]) -> "ItemTable":
+        """
+        Tabla a partir de dicts de ítems (inversa de to_dicts). Los números pueden venir
+        como texto ("1.234", "Gs. 1.500,50"; ver num_parse); las columnas del match y
+        cualquier otra clave (precio_total_iva, b_mano_obra, ...) se conservan.
+        """
+        t = cls()
+        t.nro = array("q", parse_ints([it.get("nro") for it in items], default=0))
+        t.descripcion = [str(it.get("descripcion", "") or "") for it in items]
+        t.unidad = [str(it.get("unidad", "") or "") for it in items]
+        t.cantidad = array("d", [q or 1.0 for q in parse_numbers([it.get("cantidad") for it in items])])
+        t.precio_total = array("q", parse_ints([it.get("precio_total") for it in items], default=0))
+
+        for i, it in enumerate(items):
+            for key, value in it.items():
+                if key not in BASE_COLUMNS:
+                    ItemView(t, i)[key] = value
+        return t
+
+    def ensure_match_columns(self) -> None:
+        """Crea las columnas del match con todas las celdas sin completar."""
+        n = len(self.nro)
+        if self.a_herramientas is None:
+            self.a_herramientas = [None] * n
+            self.a_materiales = [None] * n
+            self.match_score = array("d", [_UNSET_SCORE]) * n
+            self.match_desc = [None] * n
+
+    # ---- acceso ----
+    def columns(self) -> tuple:
+        if self.a_herramientas is None:
+            return BASE_COLUMNS
+        return BASE_COLUMNS + MATCH_COLUMNS
+
+    def extra(self, i: int) -> Optional[Dict[str, Any]]:
+        return self._extra.get(i) if self._extra else None
+
+    def __len__(self) -> int:
+        return len(self.nro)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union["ItemView", "ItemTable"]:
+        if isinstance(i, slice):
+            return self._slice(i)
+        n = len(self.nro)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("ItemTable index out of range")
+        return ItemView(self, i)
+
+    def __iter__(self) -> Iterator["ItemView"]:
+        for i in range(len(self.nro)):
+            yield ItemView(self, i)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [dict(v) for v in self]
+
+    def _slice(self, sl: slice) -> "ItemTable":
+        t = ItemTable()
+        for col in self.columns():
+            setattr(t, col, getattr(self, col)[sl])
+        if self._extra:
+            idx = range(len(self.nro))[sl]
+            t._extra = {j: dict(self._extra[i]) for j, i in enumerate(idx) if i in self._extra}
+        return t
+
+    def __repr__(self) -> str:
+        return f"<ItemTable {len(self)} ítems, columnas={list(self.columns())}>"
+
+
+class ItemView(MutableMapping):
+    """Vista tipo dict de la fila `i` de un ItemTable (lee y escribe en las columnas)."""
+
+    __slots__ = ("_table", "_i")
+
+    def __init__(self, table: ItemTable, i: int):
+        self._table = table
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        t = self._table
+        if key in t.columns():
+            value = getattr(t, key)[self._i]
+            if key in MATCH_COLUMNS and _is_unset(value):
+                raise KeyError(key)
+            return value
+        extra = t.extra(self._i)
+        if extra is not None and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        t = self._table
+        if key in MATCH_COLUMNS and t.a_herramientas is None:
+            t.ensure_match_columns()
+        if key in t.columns():
+            getattr(t, key)[self._i] = value
+            return
+        if t._extra is None:
+            t._extra = {}
+        t._extra.setdefault(self._i, {})[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        t = self._table
+        if key in MATCH_COLUMNS and key in t.columns():
+            if _is_unset(getattr(t, key)[self._i]):
+                raise KeyError(key)
+            getattr(t, key)[self._i] = _UNSET_SCORE if key == "match_score" else None
+            return
+        if key in t.columns():
+            raise TypeError(f"No se puede borrar la columna {key!r} de un ItemTable.")
+        extra = self._table.extra(self._i)
+        if extra is None or key not in extra:
+            raise KeyError(key)
+        del extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        t = self._table
+        yield from BASE_COLUMNS
+        if t.a_herramientas is not None:
+            for key in MATCH_COLUMNS:
+                if not _is_unset(getattr(t, key)[self._i]):
+                    yield key
+        extra = t.extra(self._i)
+        if extra:
+            yield from extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"ItemView({dict(self)!r})"
+
+
+def _is_unset(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+Items = Union[ItemTable, List[Dict[str, Any]]]
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+log = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+
+
+@dataclass
+class Job:
+    """
+    Estado de una generación en segundo plano. Los contadores los va actualizando el worker.
+    `pdf_path` es el archivo que se descarga (el ZIP en un lote, con files_done / total_files).
+    """
+
+    id: str
+    pdf_path: Path
+    download_name: str = "desglose.pdf"
+    status: str = JOB_QUEUED
+    items_parsed: int = 0
+    pages_rendered: int = 0
+    pages_reused: int = 0  # de esas, cuántas salieron del cache de páginas
+    total_pages: int = 0
+    files_done: int = 0
+    total_files: int = 0
+    error: str = ""
+    timings: Dict[str, float] = field(default_factory=dict)  # ms por etapa (services.profiling)
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "items_parsed": self.items_parsed,
+            "pages_rendered": self.pages_rendered,
+            "pages_reused": self.pages_reused,
+            "total_pages": self.total_pages,
+            "files_done": self.files_done,
+            "total_files": self.total_files,
+            "error": self.error,
+            "timings": self.timings,
+            "elapsed_s": round((self.finished_at or time.time()) - self.created_at, 2),
+        }
+
+
+class JobManager:
+    """
+    Cola local de trabajos sobre un ThreadPoolExecutor.
+
+    `work(job)` corre en un worker, debe escribir el PDF en `job.pdf_path` y puede ir
+    actualizando `job.items_parsed` / `job.pages_rendered`. Los trabajos terminados se
+    olvidan (y se borra su PDF) pasado `ttl_seconds`.
+
+    submit(..., download_name="desgloses.zip") para otro tipo de archivo (lotes): el path
+    en `out_dir` toma la extensión del nombre de descarga.
+    """
+
+    def __init__(self, out_dir: Path, max_workers: int = 2, ttl_seconds: float = 3600.0):
+        self.out_dir = Path(out_dir)
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="desglose-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+
+    def submit(self, work: Callable[[Job], None], download_name: str = "desglose.pdf") -> Job:
+        self._purge_expired()
+
+        job_id = uuid.uuid4().hex
+        stem, suffix = os.path.splitext(download_name)
+        job = Job(id=job_id, pdf_path=self.out_dir / f"{stem}_{job_id}{suffix}", download_name=download_name)
+        with self._lock:
+            self._jobs[job_id] = job
+        job.future = self._executor.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job: Job, timeout: float) -> bool:
+        """Espera hasta `timeout` segundos. True si el trabajo terminó (bien o con error)."""
+        if job.future is None:
+            return False
+        try:
+            job.future.result(timeout=max(timeout, 0.0))
+        except Exception:
+            pass
+        return job.status in (JOB_DONE, JOB_ERROR)
+
+    def _run(self, job: Job, work: Callable[[Job], None]) -> None:
+        job.status = JOB_RUNNING
+        try:
+            work(job)
+            job.status = JOB_DONE
+        except Exception as e:
+            log.exception("Falló el job %s", job.id)
+            job.error = str(e)
+            job.status = JOB_ERROR
+        finally:
+            job.finished_at = time.time()
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        with self._lock:
+            expired = [
+                j for j in self._jobs.values()
+                if j.finished_at is not None and now - j.finished_at > self.ttl_seconds
+            ]
+            for j in expired:
+                del self._jobs[j.id]
+
+        for j in expired:
+            try:
+                os.remove(j.pdf_path)
+            except OSError:
+                pass
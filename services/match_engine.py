@@ -1,30 +1,29 @@
 from __future__ import annotations
 
-import re
-import unicodedata
+import logging
+import os
+import threading
+from collections import Counter
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import openpyxl
 
+from .item_table import Items, ItemTable
+from .match_index import MatchIndex, index_path_for, read_match_index, write_match_index
+from .match_memo import MatchMemo
+from .profiling import span
+from .text_norm import norm_text, tokens
+from .tfidf_matcher import TfidfMatcher
 
-def _norm(s: Any) -> str:
-    if s is None:
-        return ""
-    s = str(s).strip().lower()
-    s = unicodedata.normalize("NFD", s)
-    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
-    s = re.sub(r"[^a-z0-9\s]+", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+# "keyword": fracción de keywords de la fila presentes en el ítem (tokens exactos)
+# "tfidf": coseno TF-IDF de palabras + n-gramas de caracteres (tolera plurales / typos)
+MATCH_MODES = ("keyword", "tfidf")
 
-
-def _tokens(s: Any) -> List[str]:
-    s2 = _norm(s)
-    if not s2:
-        return []
-    # tokens simples
-    return [t for t in s2.split(" ") if t]
+log = logging.getLogger(__name__)
 
 
 @dataclass
@@ -43,11 +42,11 @@ def _load_match_rows(match_xlsx_path: str) -> Tuple[List[MatchRow], MatchRow]:
 
     # Leer headers (primera fila)
     headers = [str(c.value).strip() if c.value is not None else "" for c in ws[1]]
-    headers_norm = [_norm(h) for h in headers]
+    headers_norm = [norm_text(h) for h in headers]
 
     # Solo 3 columnas: descripción, herramientas, materiales
     def find_col(name: str) -> int:
-        nn = _norm(name)
+        nn = norm_text(name)
         for i, h in enumerate(headers_norm):
             if h == nn:
                 return i
@@ -66,12 +65,12 @@ def _load_match_rows(match_xlsx_path: str) -> Tuple[List[MatchRow], MatchRow]:
         mats = ws.cell(row=r, column=c_mats + 1).value
 
         desc_str = "" if desc is None else str(desc).strip()
-        desc_norm = _norm(desc_str)
+        desc_norm = norm_text(desc_str)
         if not desc_norm:
             continue
 
-        is_default = "default" in desc_norm  # ignora acentos por _norm()
-        kw = _tokens(desc_norm)
+        is_default = "default" in desc_norm  # ignora acentos por norm_text()
+        kw = tokens(desc_norm)
 
         mr = MatchRow(
             desc_raw=desc_str,
@@ -100,7 +99,7 @@ def _keyword_score(item_desc: str, pattern_keywords: List[str]) -> float:
     """
     Score = (#keywords_del_patron encontradas en el item) / (#keywords_del_patron)
     """
-    item_tokens = set(_tokens(item_desc))
+    item_tokens = set(tokens(item_desc))
     patt = [k for k in pattern_keywords if k]  # limpia
     if not patt:
         return 0.0
@@ -108,33 +107,400 @@ def _keyword_score(item_desc: str, pattern_keywords: List[str]) -> float:
     return hit / float(len(patt))
 
 
+class KeywordMatcher:
+    """
+    Matcher compilado sobre las filas de match.xlsx.
+
+    Arma un índice invertido token -> [(id_fila, veces que aparece en la fila)] y guarda
+    la cantidad de keywords de cada fila, así cada ítem se tokeniza una sola vez y solo
+    se puntúan las filas que comparten algún token. El score es el mismo que
+    `_keyword_score` y ante empate gana la primera fila (igual que el loop original).
+    """
+
+    def __init__(self, rows: Sequence[MatchRow], default_row: MatchRow):
+        self.rows = rows
+        self.default_row = default_row
+        self._n_keywords: List[int] = []
+        self._index: Dict[str, List[Tuple[int, int]]] = {}
+
+        for i, r in enumerate(rows):
+            patt = [k for k in r.keywords if k]
+            self._n_keywords.append(len(patt))
+            for tok, cnt in Counter(patt).items():
+                self._index.setdefault(tok, []).append((i, cnt))
+
+    def best_match(self, item_desc: str) -> Tuple[Optional[MatchRow], float]:
+        """Devuelve (mejor fila, score). Si ninguna fila comparte tokens, la primera con score 0."""
+        if not self.rows:
+            return None, 0.0
+        best_i, best_score = self.best_index(item_desc)
+        return self.rows[best_i], best_score
+
+    def best_index(self, item_desc: str) -> Tuple[int, float]:
+        """Como best_match, pero con el índice de la fila (para guardarlo en el memo)."""
+        hits: Dict[int, int] = {}
+        for tok in set(tokens(item_desc)):
+            for i, cnt in self._index.get(tok, ()):
+                hits[i] = hits.get(i, 0) + cnt
+
+        best_i = 0
+        best_score = 0.0
+        for i, h in hits.items():
+            sc = h / float(self._n_keywords[i])
+            if sc > best_score or (sc == best_score and i < best_i):
+                best_i = i
+                best_score = sc
+
+        return best_i, best_score
+
+
+class IndexKeywordMatcher(KeywordMatcher):
+    """
+    KeywordMatcher que puntúa directo sobre el índice invertido del .idx: post_ptr /
+    post_row / post_cnt y kw_ptr son vistas del mmap, así que por proceso solo se arma
+    el dict token -> id y las páginas del índice quedan compartidas entre workers.
+    Mismo score y mismo desempate que KeywordMatcher.
+    """
+
+    def __init__(self, rows: Sequence[MatchRow], default_row: MatchRow, ix: MatchIndex):
+        self.rows = rows
+        self.default_row = default_row
+        self._ix = ix
+        self._token_ids: Dict[str, int] = {tok: t for t, tok in enumerate(ix.tokens)}
+
+    def best_index(self, item_desc: str) -> Tuple[int, float]:
+        ix = self._ix
+        hit_rows: List[np.ndarray] = []
+        hit_cnts: List[np.ndarray] = []
+        for tok in set(tokens(item_desc)):
+            t = self._token_ids.get(tok)
+            if t is None:
+                continue
+            a, b = ix.post_ptr[t:t + 2].tolist()
+            hit_rows.append(ix.post_row[a:b])
+            hit_cnts.append(ix.post_cnt[a:b])
+        if not hit_rows:
+            return 0, 0.0
+
+        rows, inv = np.unique(np.concatenate(hit_rows), return_inverse=True)
+        if not len(rows):
+            return 0, 0.0
+        hits = np.bincount(inv, weights=np.concatenate(hit_cnts))
+        scores = hits / (ix.kw_ptr[rows + 1] - ix.kw_ptr[rows])
+        # filas ordenadas: argmax se queda con la primera ante empate
+        j = int(np.argmax(scores))
+        return int(rows[j]), float(scores[j])
+
+
+@dataclass(frozen=True)
+class MatchTable:
+    """match.xlsx ya parseado + matcher compilado, junto con la firma del archivo de origen."""
+
+    path: str
+    mtime_ns: int
+    size: int
+    rows: Sequence[MatchRow]
+    default_row: MatchRow
+    matcher: KeywordMatcher
+    source: str = "xlsx"  # "index" si se cargó del .idx compilado
+
+    @property
+    def version(self) -> str:
+        return f"{self.mtime_ns}-{self.size}"
+
+    @cached_property
+    def tfidf(self) -> TfidfMatcher:
+        """Matcher TF-IDF de las mismas filas; se arma la primera vez que se usa el modo "tfidf"."""
+        return TfidfMatcher(self.rows)
+
+
+def _row_from_index(ix: MatchIndex, i: int) -> MatchRow:
+    desc_raw, desc_norm, herramientas, materiales = ix.row_texts(i)
+    a, b = ix.kw_ptr[i:i + 2].tolist()
+    return MatchRow(
+        desc_raw=desc_raw,
+        desc_norm=desc_norm,
+        keywords=[ix.tokens[t] for t in ix.kw_tok[a:b].tolist()],
+        herramientas=herramientas,
+        materiales=materiales,
+        is_default=i == ix.default_row,
+    )
+
+
+class _IndexRows(Sequence[MatchRow]):
+    """Filas de match de un .idx (sin DEFAULT, que va última); cada una se decodifica del mmap la primera vez que se pide."""
+
+    def __init__(self, ix: MatchIndex) -> None:
+        self._ix = ix
+        self._rows: Dict[int, MatchRow] = {}
+
+    def __len__(self) -> int:
+        return self._ix.default_row
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        row = self._rows.get(i)
+        if row is None:
+            row = self._rows[i] = _row_from_index(self._ix, i)
+        return row
+
+
+def _rows_from_index(ix: MatchIndex) -> Tuple[Sequence[MatchRow], MatchRow]:
+    if ix.default_row != ix.n_rows - 1:
+        raise ValueError("índice de match sin la fila DEFAULT al final")
+    return _IndexRows(ix), _row_from_index(ix, ix.default_row)
+
+
+def compile_match_table(match_xlsx_path: str, idx_path: Optional[Path] = None) -> Tuple[Path, int]:
+    """Parsea match.xlsx y escribe su índice compilado. Devuelve (ruta del índice, filas de match)."""
+    st = os.stat(match_xlsx_path)
+    rows, default_row = _load_match_rows(match_xlsx_path)
+    idx_path = Path(idx_path) if idx_path else index_path_for(match_xlsx_path)
+    write_match_index(idx_path, rows, default_row, st.st_mtime_ns, st.st_size)
+    return idx_path, len(rows)
+
+
+class MatchTableCache:
+    """
+    Cache de proceso de match.xlsx, clave = ruta + mtime + tamaño.
+
+    Si el archivo cambia en disco se vuelve a parsear y la entrada se reemplaza de una
+    sola vez (los requests en curso siguen usando la tabla vieja). Si el parseo falla,
+    se propaga el error y queda la versión anterior. Seguro para usar entre threads.
+
+    use_index: antes de parsear el Excel se prueba el índice compilado (match.idx al lado,
+    ver services.match_index); si no existe o es de otra versión del Excel, se parsea el
+    Excel y se recompila el índice para el próximo proceso.
+    """
+
+    def __init__(self, use_index: bool = True) -> None:
+        self._lock = threading.Lock()
+        self._tables: Dict[str, MatchTable] = {}
+        self.use_index = use_index
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.index_loads = 0
+        self.compiles = 0
+
+    def _load(self, path: str, st: os.stat_result) -> Tuple[Sequence[MatchRow], MatchRow, KeywordMatcher, str]:
+        idx_path = index_path_for(path)
+        if self.use_index:
+            try:
+                ix = read_match_index(idx_path)
+                if (ix.source_mtime_ns, ix.source_size) == (st.st_mtime_ns, st.st_size):
+                    rows, default_row = _rows_from_index(ix)
+                    self.index_loads += 1
+                    return rows, default_row, IndexKeywordMatcher(rows, default_row, ix), "index"
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                log.warning("Índice de match %s inválido, se recompila: %s", idx_path, e)
+
+        rows, default_row = _load_match_rows(path)
+        if self.use_index:
+            try:
+                write_match_index(idx_path, rows, default_row, st.st_mtime_ns, st.st_size)
+                self.compiles += 1
+            except OSError as e:
+                log.warning("No se pudo escribir el índice de match %s: %s", idx_path, e)
+        return rows, default_row, KeywordMatcher(rows, default_row), "xlsx"
+
+    def get(self, match_xlsx_path: str) -> MatchTable:
+        path = os.path.abspath(match_xlsx_path)
+        st = os.stat(path)
+
+        with self._lock:
+            cached = self._tables.get(path)
+            if cached is not None and cached.mtime_ns == st.st_mtime_ns and cached.size == st.st_size:
+                self.hits += 1
+                return cached
+
+            rows, default_row, matcher, source = self._load(path, st)
+            table = MatchTable(
+                path=path,
+                mtime_ns=st.st_mtime_ns,
+                size=st.st_size,
+                rows=rows,
+                default_row=default_row,
+                matcher=matcher,
+                source=source,
+            )
+            if cached is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+            self._tables[path] = table
+            return table
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "tables": len(self._tables),
+                "index_loads": self.index_loads,
+                "compiles": self.compiles,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
+
+
+_MATCH_CACHE = MatchTableCache()
+
+
+def load_match_table(match_xlsx_path: str) -> MatchTable:
+    """match.xlsx parseado, usando el cache de proceso."""
+    return _MATCH_CACHE.get(match_xlsx_path)
+
+
+def match_cache_stats() -> Dict[str, int]:
+    return _MATCH_CACHE.stats()
+
+
+# Memo de proceso descripción -> mejor fila (desactivado hasta configure_match_memo)
+_MATCH_MEMO = MatchMemo(0)
+
+
+def configure_match_memo(max_entries: int, db_path: Optional[Path] = None) -> MatchMemo:
+    """
+    Activa el memo de proceso que usa enrich_items_with_match (max_entries = 0 lo desactiva).
+    Con la misma configuración que el actual no hace nada (se conserva lo memorizado).
+    """
+    global _MATCH_MEMO
+    db_path = Path(db_path) if db_path else None
+    if _MATCH_MEMO.max_entries != max_entries or _MATCH_MEMO.db_path != db_path:
+        _MATCH_MEMO = MatchMemo(max_entries, db_path)
+    return _MATCH_MEMO
+
+
+def match_memo_stats() -> Dict[str, Any]:
+    return _MATCH_MEMO.stats()
+
+
+def _chosen_fields(
+    best_row: Optional[MatchRow],
+    best_score: float,
+    default_row: MatchRow,
+    threshold: float,
+) -> Tuple[str, str, float, str]:
+    """(a_herramientas, a_materiales, match_score, match_desc): la mejor fila si llega al threshold, si no DEFAULT."""
+    chosen = best_row if (best_row is not None and best_score >= threshold) else default_row
+
+    return (
+        chosen.herramientas or "herramientas de mano",
+        chosen.materiales or "consumibles varios",
+        float(best_score) if best_row else 0.0,
+        chosen.desc_raw,
+    )
+
+
+def _best_rows(table: MatchTable, descs_norm: List[str], mode: str) -> Dict[str, Tuple[int, float]]:
+    """(índice de la mejor fila, score) de cada descripción (tfidf: todas en un solo producto de matrices)."""
+    if mode == "tfidf":
+        best, scores = table.tfidf.best_matches(descs_norm)
+        return dict(zip(descs_norm, zip(best.tolist(), scores.tolist())))
+    return {desc: table.matcher.best_index(desc) for desc in descs_norm}
+
+
+def _match_all(
+    table: MatchTable,
+    descs: List[str],
+    threshold: float,
+    mode: str,
+    memo: MatchMemo,
+    report: Optional[Dict[str, Any]] = None,
+) -> List[Tuple[str, str, float, str]]:
+    """
+    Campos de match para todas las descripciones. Cada descripción distinta (normalizada)
+    se busca primero en el memo y solo las que faltan se puntúan.
+    """
+    keys = [norm_text(desc) for desc in descs]
+    unique = list(dict.fromkeys(keys))
+
+    found = memo.get_many(table.path, table.version, mode, unique)
+    missing = [k for k in unique if k not in found]
+    if report is not None and memo.enabled:
+        report["memo_hits"] = len(found)
+        report["memo_misses"] = len(missing)
+    if missing:
+        scored = _best_rows(table, missing, mode)
+        memo.put_many(table.path, table.version, mode, scored)
+        found.update(scored)
+
+    rows = table.rows
+    return [
+        _chosen_fields(rows[found[k][0]] if rows else None, found[k][1], table.default_row, threshold)
+        for k in keys
+    ]
+
+
 def enrich_items_with_match(
-    items: List[Dict[str, Any]],
+    items: Items,
     match_xlsx_path: str,
     threshold: float = 0.80,
-) -> List[Dict[str, Any]]:
-    rows, default_row = _load_match_rows(match_xlsx_path)
+    mode: str = "keyword",
+    memo: Optional[MatchMemo] = None,
+    report: Optional[Dict[str, Any]] = None,
+) -> Items:
+    """
+    Agrega a cada ítem a_herramientas / a_materiales / match_score / match_desc.
 
-    out: List[Dict[str, Any]] = []
-    for it in items:
-        desc = it.get("descripcion", "") or it.get("Descripción", "") or ""
-        best_score = -1.0
-        best_row: Optional[MatchRow] = None
-
-        for r in rows:
-            sc = _keyword_score(desc, r.keywords)
-            if sc > best_score:
-                best_score = sc
-                best_row = r
+    - ItemTable: se anota en el lugar (columnas nuevas) y se devuelve la misma tabla.
+    - lista de dicts: se devuelve una lista nueva de dicts (como antes).
+
+    mode: "keyword" (default, tokens exactos) o "tfidf" (coseno TF-IDF, ver TfidfMatcher).
+    En los dos, si el mejor score no llega a `threshold` se usa la fila DEFAULT.
+
+    memo: descripciones ya puntuadas antes (default: el memo de proceso, ver configure_match_memo).
+    report: si se pasa un dict, se completa con memo_hits / memo_misses de esta llamada
+    (descripciones distintas resueltas por el memo / puntuadas).
+    """
+    if mode not in MATCH_MODES:
+        raise ValueError(f"mode inválido: {mode!r} (opciones: {', '.join(MATCH_MODES)})")
+
+    with span("match_load"):
+        table = load_match_table(match_xlsx_path)
+        if mode == "tfidf":
+            table.tfidf  # la matriz de filas se arma una vez por versión de match.xlsx
+
+    if isinstance(items, ItemTable):
+        descs = [desc or "" for desc in items.descripcion]
+    else:
+        descs = [it.get("descripcion", "") or it.get("Descripción", "") or "" for it in items]
 
-        chosen = best_row if (best_row is not None and best_score >= threshold) else default_row
+    with span("match"):
+        fields = _match_all(table, descs, threshold, mode, memo if memo is not None else _MATCH_MEMO, report)
 
+    if isinstance(items, ItemTable):
+        items.ensure_match_columns()
+        for i, f in enumerate(fields):
+            (
+                items.a_herramientas[i],
+                items.a_materiales[i],
+                items.match_score[i],
+                items.match_desc[i],
+            ) = f
+        return items
+
+    out: List[Dict[str, Any]] = []
+    for it, f in zip(items, fields):
         it2 = dict(it)
         # Nombres EXACTOS que usás en el costeo
-        it2["a_herramientas"] = chosen.herramientas or "herramientas de mano"
-        it2["a_materiales"] = chosen.materiales or "consumibles varios"
-        it2["match_score"] = float(best_score) if best_row else 0.0
-        it2["match_desc"] = chosen.desc_raw
+        (
+            it2["a_herramientas"],
+            it2["a_materiales"],
+            it2["match_score"],
+            it2["match_desc"],
+        ) = f
         out.append(it2)
 
-    return out
\ No newline at end of file
+    return out
@@ -0,0 +1,200 @@
+"""
+match.xlsx compilado a un índice binario que se abre con mmap.
+
+    python -m services.match_index data/match.xlsx          # -> data/match.idx
+
+match_engine lo usa solo (ver MatchTableCache): si el .idx existe y fue compilado
+desde la misma versión del Excel (mtime + tamaño), se carga en milisegundos; si no,
+se parsea el Excel y se recompila. Las secciones numéricas y los textos de las filas
+se leen directo del mmap (los textos se decodifican recién cuando se piden), así que
+los procesos que abren el mismo archivo comparten esas páginas.
+"""
+from __future__ import annotations
+
+import argparse
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Sequence, TYPE_CHECKING, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .match_engine import MatchRow
+
+INDEX_SUFFIX = ".idx"
+_MAGIC = b"DGMX"
+_FORMAT_VERSION = 1
+# magic, versión, mtime_ns y tamaño del Excel, filas, tokens, keywords, postings, fila DEFAULT, bytes de texto
+_HEADER = struct.Struct("<4sIqqIIIIII")
+_ALIGN = 8
+
+
+def index_path_for(match_xlsx_path: str | Path) -> Path:
+    """data/match.xlsx -> data/match.idx"""
+    return Path(match_xlsx_path).with_suffix(INDEX_SUFFIX)
+
+
+@dataclass
+class MatchIndex:
+    """
+    Contenido de un .idx. Tokens ya decodificados; el resto son arrays uint32 (vistas
+    sobre el mmap) y los textos de cada fila se decodifican con row_texts():
+
+      kw_ptr[i]:kw_ptr[i+1]      ids de token de las keywords de la fila i (en orden)
+      post_ptr[t]:post_ptr[t+1]  filas (post_row) y repeticiones (post_cnt) del token t,
+                                 sin contar la fila DEFAULT
+    """
+
+    source_mtime_ns: int
+    source_size: int
+    tokens: List[str]
+    n_rows: int
+    default_row: int
+    kw_ptr: np.ndarray
+    kw_tok: np.ndarray
+    post_ptr: np.ndarray
+    post_row: np.ndarray
+    post_cnt: np.ndarray
+    str_off: np.ndarray
+    blob: memoryview
+
+    def row_texts(self, i: int) -> Tuple[str, str, str, str]:
+        """(desc_raw, desc_norm, herramientas, materiales) de la fila i."""
+        base = len(self.tokens) + 4 * i
+        off = self.str_off[base:base + 5].tolist()
+        raw, norm, tools, mats = (bytes(self.blob[off[k]:off[k + 1]]).decode("utf-8") for k in range(4))
+        return raw, norm, tools, mats
+
+
+def _pad(buf: bytearray) -> None:
+    buf.extend(b"\0" * (-len(buf) % _ALIGN))
+
+
+def write_match_index(
+    idx_path: Path,
+    rows: Sequence["MatchRow"],
+    default_row: "MatchRow",
+    source_mtime_ns: int,
+    source_size: int,
+) -> None:
+    """Escribe el índice de `rows` + DEFAULT (va última). Atómico: .part + os.replace."""
+    all_rows = list(rows) + [default_row]
+
+    token_ids: Dict[str, int] = {}
+    kw_tok: List[int] = []
+    kw_ptr = [0]
+    for r in all_rows:
+        kw_tok.extend(token_ids.setdefault(k, len(token_ids)) for k in r.keywords if k)
+        kw_ptr.append(len(kw_tok))
+
+    # Índice invertido (mismo orden que KeywordMatcher: por fila, tokens en orden de aparición)
+    postings: List[List[Tuple[int, int]]] = [[] for _ in token_ids]
+    for i in range(len(rows)):
+        counts: Dict[int, int] = {}
+        for t in kw_tok[kw_ptr[i]:kw_ptr[i + 1]]:
+            counts[t] = counts.get(t, 0) + 1
+        for t, cnt in counts.items():
+            postings[t].append((i, cnt))
+    post_ptr = np.zeros(len(token_ids) + 1, dtype=np.uint32)
+    post_ptr[1:] = np.cumsum([len(p) for p in postings])
+    flat = [pc for p in postings for pc in p]
+
+    texts = list(token_ids)
+    for r in all_rows:
+        texts += [r.desc_raw, r.desc_norm, r.herramientas, r.materiales]
+    encoded = [t.encode("utf-8") for t in texts]
+    str_off = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    str_off[1:] = np.cumsum([len(e) for e in encoded])
+    blob = b"".join(encoded)
+
+    buf = bytearray(_HEADER.pack(
+        _MAGIC, _FORMAT_VERSION, source_mtime_ns, source_size,
+        len(all_rows), len(token_ids), len(kw_tok), len(flat), len(all_rows) - 1, len(blob),
+    ))
+    for arr in (
+        str_off,
+        np.asarray(kw_ptr, dtype=np.uint32),
+        np.asarray(kw_tok, dtype=np.uint32),
+        post_ptr,
+        np.asarray([r for r, _ in flat], dtype=np.uint32),
+        np.asarray([c for _, c in flat], dtype=np.uint32),
+    ):
+        _pad(buf)
+        buf += arr.tobytes()
+    buf += blob
+
+    idx_path = Path(idx_path)
+    part = idx_path.with_suffix(idx_path.suffix + ".part")
+    part.write_bytes(buf)
+    os.replace(part, idx_path)
+
+
+def read_match_index(idx_path: Path) -> MatchIndex:
+    """Abre el índice con mmap. ValueError si el archivo no es un índice válido de esta versión."""
+    with open(idx_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(mm) < _HEADER.size:
+        raise ValueError("índice de match truncado")
+    (magic, version, mtime_ns, size, n_rows, n_tokens, n_kw, n_post, default_row, blob_len) = _HEADER.unpack_from(mm)
+    if magic != _MAGIC or version != _FORMAT_VERSION:
+        raise ValueError("índice de match de otro formato / versión")
+
+    offset = _HEADER.size
+
+    def _array(count: int) -> np.ndarray:
+        nonlocal offset
+        offset += -offset % _ALIGN
+        if offset + 4 * count > len(mm):
+            raise ValueError("índice de match truncado")
+        arr = np.frombuffer(mm, dtype="<u4", count=count, offset=offset)
+        offset += 4 * count
+        return arr
+
+    n_strings = n_tokens + 4 * n_rows
+    str_off = _array(n_strings + 1)
+    kw_ptr = _array(n_rows + 1)
+    kw_tok = _array(n_kw)
+    post_ptr = _array(n_tokens + 1)
+    post_row = _array(n_post)
+    post_cnt = _array(n_post)
+    if offset + blob_len != len(mm):
+        raise ValueError("índice de match truncado")
+
+    blob = memoryview(mm)[offset:offset + blob_len]
+    bounds = str_off[:n_tokens + 1].tolist()
+    tokens = [bytes(blob[bounds[t]:bounds[t + 1]]).decode("utf-8") for t in range(n_tokens)]
+
+    return MatchIndex(
+        source_mtime_ns=mtime_ns,
+        source_size=size,
+        tokens=tokens,
+        n_rows=n_rows,
+        default_row=default_row,
+        kw_ptr=kw_ptr,
+        kw_tok=kw_tok,
+        post_ptr=post_ptr,
+        post_row=post_row,
+        post_cnt=post_cnt,
+        str_off=str_off,
+        blob=blob,
+    )
+
+
+def main() -> None:
+    from .match_engine import compile_match_table  # import diferido: match_engine importa este módulo
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("xlsx", type=Path, help="match.xlsx")
+    ap.add_argument("-o", "--out", type=Path, help=f"índice de salida (default: mismo nombre con {INDEX_SUFFIX})")
+    args = ap.parse_args()
+
+    out, n_rows = compile_match_table(str(args.xlsx), args.out)
+    print(f"{args.xlsx} -> {out} ({n_rows} filas + DEFAULT, {out.stat().st_size / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
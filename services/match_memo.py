@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+_SQL_CHUNK = 500  # parámetros por SELECT ... IN (...)
+
+# Conexiones heredadas de un fork: se dejan abiertas sin usar (ver MatchMemo._own_db)
+_INHERITED_DBS: List[sqlite3.Connection] = []
+
+# (ruta de match.xlsx, versión, modo, descripción normalizada) -> (índice de la mejor fila, score)
+_Key = Tuple[str, str, str, str]
+_Entry = Tuple[int, float]
+
+
+class MatchMemo:
+    """
+    Memo entre requests: descripción normalizada -> mejor fila de match.xlsx y su score.
+
+    Las mismas descripciones ("Excavación de zanja", ...) aparecen en casi todos los
+    presupuestos; con esto se puntúan una sola vez por versión de match.xlsx y modo.
+    Se guarda la mejor fila + score (antes del threshold), así el mismo memo sirve para
+    cualquier threshold.
+
+    - En memoria: LRU de hasta `max_entries` entradas (0 desactiva el memo).
+    - db_path (opcional): SQLite con las mismas entradas (hasta `max_disk_entries`), que
+      sobrevive reinicios y se comparte entre procesos; lo que no está en memoria se
+      busca ahí antes de puntuar.
+
+    Cuando cambia la versión de un match.xlsx se borran sus entradas viejas (memoria y disco).
+
+    Si el proceso se forkea con el memo ya abierto (p. ej. los workers del lote salen del
+    forkserver, que importó la app), el hijo abre su propia conexión SQLite la primera vez
+    que la usa. Los pools no usan fork desde procesos con threads (ver
+    services.utils.process_pool_context), así que el lock nunca llega tomado a un hijo.
+    """
+
+    def __init__(self, max_entries: int, db_path: Optional[Path] = None, max_disk_entries: int = 0):
+        self.max_entries = max_entries
+        self.db_path = Path(db_path) if db_path else None
+        self.max_disk_entries = max_disk_entries or max_entries * 10
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[_Key, _Entry]" = OrderedDict()
+        self._versions: Dict[str, str] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid = os.getpid()  # dueño de self._db
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.enabled and self.db_path is not None:
+            self._open_db()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _open_db(self) -> None:
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.db_path), timeout=5.0, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS memo ("
+                " path TEXT NOT NULL, version TEXT NOT NULL, mode TEXT NOT NULL, descr TEXT NOT NULL,"
+                " row INTEGER NOT NULL, score REAL NOT NULL,"
+                " PRIMARY KEY (path, mode, descr))"
+            )
+            db.commit()
+            self._db = db
+        except sqlite3.Error as e:
+            log.warning("Memo de match: sin persistencia en %s (%s)", self.db_path, e)
+            self._db = None
+
+    def _own_db(self) -> Optional[sqlite3.Connection]:
+        """La conexión de este proceso: en el hijo de un fork la heredada es del padre y se abre otra."""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            if self._db is not None:
+                # Ni usarla ni cerrarla: al cerrar, SQLite puede hacer checkpoint del WAL del padre
+                _INHERITED_DBS.append(self._db)
+                self._db = None
+                self._open_db()
+        return self._db
+
+    def _db_call(self, fn, *args):
+        """Operación sobre SQLite; si falla (bloqueado, disco lleno) se sigue solo con memoria."""
+        db = self._own_db()
+        if db is None:
+            return None
+        try:
+            return fn(db, *args)
+        except sqlite3.Error as e:
+            log.warning("Memo de match: error de SQLite (%s)", e)
+            return None
+
+    def _check_version_locked(self, path: str, version: str) -> None:
+        """Primera vez que se ve esta versión de `path`: se descarta lo de versiones anteriores."""
+        if self._versions.get(path) == version:
+            return
+        if path in self._versions:
+            for key in [k for k in self._lru if k[0] == path and k[1] != version]:
+                del self._lru[key]
+
+        def _purge(db: sqlite3.Connection) -> None:
+            db.execute("DELETE FROM memo WHERE path = ? AND version <> ?", (path, version))
+            db.commit()
+
+        self._db_call(_purge)
+        self._versions[path] = version
+
+    def get_many(self, path: str, version: str, mode: str, descs: Iterable[str]) -> Dict[str, _Entry]:
+        """Entradas ya conocidas para esas descripciones normalizadas (las demás no aparecen)."""
+        if not self.enabled:
+            return {}
+
+        found: Dict[str, _Entry] = {}
+        missing = []
+        with self._lock:
+            self._check_version_locked(path, version)
+            for desc in descs:
+                key = (path, version, mode, desc)
+                entry = self._lru.get(key)
+                if entry is not None:
+                    self._lru.move_to_end(key)
+                    found[desc] = entry
+                else:
+                    missing.append(desc)
+            self.hits += len(found)
+
+            if missing and self._own_db() is not None:
+                def _select(db: sqlite3.Connection) -> Dict[str, _Entry]:
+                    out: Dict[str, _Entry] = {}
+                    for i in range(0, len(missing), _SQL_CHUNK):
+                        chunk = missing[i:i + _SQL_CHUNK]
+                        rows = db.execute(
+                            "SELECT descr, row, score FROM memo WHERE path = ? AND version = ? AND mode = ?"
+                            f" AND descr IN ({','.join('?' * len(chunk))})",
+                            (path, version, mode, *chunk),
+                        )
+                        out.update((d, (r, s)) for d, r, s in rows)
+                    return out
+
+                from_disk = self._db_call(_select) or {}
+                for desc, entry in from_disk.items():
+                    self._put_locked((path, version, mode, desc), entry)
+                found.update(from_disk)
+                self.disk_hits += len(from_disk)
+                self.misses += len(missing) - len(from_disk)
+            else:
+                self.misses += len(missing)
+        return found
+
+    def put_many(self, path: str, version: str, mode: str, entries: Mapping[str, _Entry]) -> None:
+        if not self.enabled or not entries:
+            return
+        with self._lock:
+            if self._versions.get(path) != version:
+                return  # la tabla cambió mientras se puntuaba: no guardar resultados viejos
+            for desc, entry in entries.items():
+                self._put_locked((path, version, mode, desc), entry)
+
+            def _insert(db: sqlite3.Connection) -> None:
+                db.executemany(
+                    "INSERT OR REPLACE INTO memo (path, version, mode, descr, row, score) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(path, version, mode, d, int(r), float(s)) for d, (r, s) in entries.items()],
+                )
+                db.execute(
+                    "DELETE FROM memo WHERE rowid <= (SELECT MAX(rowid) FROM memo) - ?",
+                    (self.max_disk_entries,),
+                )
+                db.commit()
+
+            self._db_call(_insert)
+
+    def _put_locked(self, key: _Key, entry: _Entry) -> None:
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self._versions.clear()
+
+            def _delete(db: sqlite3.Connection) -> None:
+                db.execute("DELETE FROM memo")
+                db.commit()
+
+            self._db_call(_delete)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "persistent": self._own_db() is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+# "Gs. 1.234.567,50" / "1.234.567" / "1234,5" / "-1.000" (punto = miles, coma = decimales)
+_PY_NUMBER_RE = re.compile(r"(?:Gs\.?\s*)?(-?)(\d{1,3}(?:\.\d{3})+|\d+)(?:,(\d{1,2}))?")
+# "12.5" / "-1234.50" (punto decimal con 1-2 decimales)
+_DOT_DECIMAL_RE = re.compile(r"-?\d+\.\d{1,2}")
+_NOT_NUMERIC_RE = re.compile(r"[^\d\.\-]")
+
+
+def _parse_str_general(s: str) -> Optional[float]:
+    """Camino general (cualquier mezcla de separadores / texto). `s` ya viene con strip()."""
+    s = s.replace("\u00a0", " ").strip()
+    s = s.replace("Gs.", "").replace("Gs", "").strip()
+
+    # manejo separadores
+    if "," in s and "." in s:
+        last_comma = s.rfind(",")
+        last_dot = s.rfind(".")
+        if last_comma > last_dot:
+            s = s.replace(".", "")
+            s = s.replace(",", ".")
+        else:
+            s = s.replace(",", "")
+    else:
+        if "," in s:
+            parts = s.split(",")
+            if len(parts) == 2 and len(parts[1]) in (1, 2):
+                s = parts[0].replace(".", "").replace(",", "") + "." + parts[1]
+            else:
+                s = s.replace(",", "")
+        if "." in s:
+            parts = s.split(".")
+            if not (len(parts) == 2 and len(parts[1]) in (1, 2)):
+                s = s.replace(".", "")
+
+    s = _NOT_NUMERIC_RE.sub("", s)
+    if not s or s in ("-", ".", "-."):
+        return None
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def _parse_str(s: str) -> Optional[float]:
+    s = s.strip()
+    if not s:
+        return None
+
+    m = _PY_NUMBER_RE.fullmatch(s)
+    if m is not None:
+        sign, int_part, dec = m.groups()
+        num = sign + int_part.replace(".", "")
+        return float(num + "." + dec if dec else num)
+
+    if _DOT_DECIMAL_RE.fullmatch(s):
+        return float(s)
+
+    return _parse_str_general(s)
+
+
+def parse_number(v: Any) -> Optional[float]:
+    """
+    Número de una celda de planilla paraguaya -> float (None si no es número).
+
+    Acepta números nativos y textos tipo "Gs. 1.234.567,50", "1.234.567", "1234,5", "12.50".
+    Un punto seguido de 3 dígitos es separador de miles; coma o punto con 1-2 dígitos, decimales.
+    NaN / infinito -> None.
+    """
+    if v is None:
+        return None
+    if isinstance(v, (int, float)):
+        if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
+            return None
+        return float(v)
+    return _parse_str(str(v))
+
+
+def parse_int(v: Any) -> Optional[int]:
+    """parse_number redondeado a entero (mismo redondeo que round())."""
+    f = parse_number(v)
+    if f is None:
+        return None
+    return int(round(f))
+
+
+def parse_numbers(values: Iterable[Any]) -> List[Optional[float]]:
+    """
+    Versión batch de parse_number para una columna entera (lista, tupla o array de numpy).
+    Los textos repetidos (muy comunes en planillas) se parsean una sola vez.
+    """
+    if getattr(values, "dtype", None) is not None:
+        values = values.tolist()  # array numpy -> escalares de Python (camino rápido int/float)
+
+    out: List[Optional[float]] = []
+    append = out.append
+    memo: Dict[str, Optional[float]] = {}
+    isnan = math.isnan
+    isinf = math.isinf
+
+    for v in values:
+        if v is None:
+            append(None)
+        elif type(v) is int:
+            append(float(v))
+        elif type(v) is float:
+            append(None if (isnan(v) or isinf(v)) else v)
+        elif type(v) is str:
+            f = memo.get(v, memo)
+            if f is memo:
+                f = memo[v] = _parse_str(v)
+            append(f)
+        else:
+            append(parse_number(v))
+
+    return out
+
+
+def parse_ints(values: Iterable[Any], default: Optional[int] = None) -> List[Optional[int]]:
+    """Versión batch de parse_int; `default` reemplaza a los valores que no son número."""
+    return [default if f is None else int(round(f)) for f in parse_numbers(values)]
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Mapping, Optional, Sequence
+
+from pypdf import PageObject, PdfReader
+
+log = logging.getLogger(__name__)
+
+# Campos del ítem que se dibujan en la página (cualquier engine)
+PAGE_FIELDS = ("nro", "descripcion", "a_herramientas", "a_materiales", "b_mano_obra")
+
+# Subir si cambia el dibujo del overlay / template_map: invalida todas las páginas guardadas
+# (y subir también result_cache._KEY_VERSION, que cubre los PDFs completos)
+_KEY_VERSION = "2"
+
+_DOC_SUFFIX = ".pdf"
+_KEYS_SUFFIX = ".keys"
+
+
+def page_keys(
+    items: Sequence[Mapping[str, Any]],
+    per_page: int,
+    fecha_ddmmyyyy: str,
+    logo_digest: str,
+    template_digest: str,
+    engine: str,
+) -> List[str]:
+    """Una clave por página: hash de lo que se dibuja en ella (ítems de la hoja + fecha + logo + template)."""
+    head = [_KEY_VERSION, engine, fecha_ddmmyyyy, logo_digest, template_digest]
+    keys: List[str] = []
+    for start in range(0, len(items), per_page):
+        rows = [
+            [items[i].get(f) for f in PAGE_FIELDS]
+            for i in range(start, min(start + per_page, len(items)))
+        ]
+        payload = json.dumps(head + rows, ensure_ascii=False, default=str)
+        keys.append(hashlib.sha256(payload.encode("utf-8")).hexdigest())
+    return keys
+
+
+class _TeeSink:
+    """Escribe en el sink del caller y en el archivo del cache a la vez (tell() relativo al PDF)."""
+
+    def __init__(self, sink: BinaryIO, copy: BinaryIO):
+        self._sink = sink
+        self._copy = copy
+        self._pos = 0
+
+    def write(self, data: bytes) -> int:
+        self._sink.write(data)
+        self._copy.write(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        self._copy.flush()
+        if hasattr(self._sink, "flush"):
+            self._sink.flush()
+
+
+@dataclass
+class _Doc:
+    size: int
+    keys: List[str] = field(default_factory=list)
+    live: int = 0  # claves del índice que todavía apuntan a este documento
+
+
+class PageCache:
+    """
+    Páginas ya compuestas (template + overlay) de PDFs generados antes, para que un
+    re-upload con unas pocas filas cambiadas re-renderice solo esas páginas.
+
+    Cada PDF generado con el cache se guarda entero en `cache_dir` junto con la lista
+    de claves de sus páginas; el índice clave -> (documento, página) apunta siempre al
+    documento más nuevo. Un documento sin páginas vigentes se borra enseguida, y si el
+    total pasa `max_bytes` se borran los documentos menos usados.
+
+    max_bytes = 0 desactiva el cache.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._docs: "OrderedDict[str, _Doc]" = OrderedDict()
+        self._index: Dict[str, tuple[str, int]] = {}
+        self._total = 0
+
+        self.pages_reused = 0
+        self.pages_rendered = 0
+        self.evictions = 0
+
+        if self.enabled:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._scan()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _doc_path(self, doc_id: str) -> Path:
+        return self.dir / f"{doc_id}{_DOC_SUFFIX}"
+
+    def _keys_path(self, doc_id: str) -> Path:
+        return self.dir / f"{doc_id}{_KEYS_SUFFIX}"
+
+    def _scan(self) -> None:
+        found = []
+        for kp in self.dir.glob(f"*{_KEYS_SUFFIX}"):
+            doc_path = kp.with_suffix(_DOC_SUFFIX)
+            try:
+                st = doc_path.stat()
+                keys = kp.read_text(encoding="ascii").split()
+            except OSError:
+                continue
+            found.append((st.st_mtime, kp.stem, st.st_size, keys))
+
+        with self._lock:
+            for _, doc_id, size, keys in sorted(found):
+                self._add_doc_locked(doc_id, size, keys)
+            self._evict_locked()
+
+    # ---- lectura ----
+    def lookup(self, keys: Sequence[str]) -> List[Optional[PageObject]]:
+        """Página guardada para cada clave (None si hay que renderizarla)."""
+        out: List[Optional[PageObject]] = [None] * len(keys)
+        if not self.enabled:
+            return out
+
+        with self._lock:
+            wanted: Dict[str, List[tuple[int, int]]] = {}
+            for pos, key in enumerate(keys):
+                hit = self._index.get(key)
+                if hit is not None:
+                    wanted.setdefault(hit[0], []).append((pos, hit[1]))
+            for doc_id in wanted:
+                self._docs.move_to_end(doc_id)
+
+        for doc_id, slots in wanted.items():
+            try:
+                data = self._doc_path(doc_id).read_bytes()
+                pages = PdfReader(io.BytesIO(data)).pages
+                for pos, page_idx in slots:
+                    out[pos] = pages[page_idx]
+            except Exception as e:
+                # Documento borrado / corrupto: esas páginas se renderizan de nuevo
+                log.warning("Cache de páginas: no se pudo leer %s (%s)", doc_id, e)
+                for pos, _ in slots:
+                    out[pos] = None
+        return out
+
+    def count(self, reused: int, rendered: int) -> None:
+        with self._lock:
+            self.pages_reused += reused
+            self.pages_rendered += rendered
+
+    # ---- escritura ----
+    @contextmanager
+    def recording(self, sink: BinaryIO, keys: Sequence[str]) -> Iterator[BinaryIO]:
+        """
+        Envuelve `sink` para que el PDF que se escriba también quede en el cache con
+        `keys` como claves de sus páginas. Si algo falla, no se guarda nada.
+        """
+        if not self.enabled:
+            yield sink
+            return
+
+        doc_id = uuid.uuid4().hex
+        part = self._doc_path(doc_id).with_suffix(".part")
+        try:
+            with open(part, "wb") as copy:
+                yield _TeeSink(sink, copy)
+            self._keys_path(doc_id).write_text("\n".join(keys), encoding="ascii")
+            os.replace(part, self._doc_path(doc_id))
+        except BaseException:
+            for p in (part, self._keys_path(doc_id)):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            raise
+
+        size = os.path.getsize(self._doc_path(doc_id))
+        with self._lock:
+            self._add_doc_locked(doc_id, size, list(keys))
+            self._evict_locked()
+
+    def _add_doc_locked(self, doc_id: str, size: int, keys: List[str]) -> None:
+        doc = _Doc(size=size, keys=keys)
+        self._docs[doc_id] = doc
+        self._total += size
+
+        stale = set()
+        for page_idx, key in enumerate(keys):
+            prev = self._index.get(key)
+            if prev is not None and prev[0] != doc_id:
+                self._docs[prev[0]].live -= 1
+                stale.add(prev[0])
+            if prev is None or prev[0] != doc_id:
+                doc.live += 1
+            self._index[key] = (doc_id, page_idx)
+
+        # Documentos que quedaron sin ninguna página vigente: ya no sirven
+        for old_id in stale:
+            if self._docs[old_id].live <= 0:
+                self._drop_locked(old_id)
+
+    def _evict_locked(self) -> None:
+        while self._total > self.max_bytes and self._docs:
+            self._drop_locked(next(iter(self._docs)))
+            self.evictions += 1
+
+    def _drop_locked(self, doc_id: str) -> None:
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self._total -= doc.size
+        for key in doc.keys:
+            if self._index.get(key, ("",))[0] == doc_id:
+                del self._index[key]
+        for p in (self._doc_path(doc_id), self._keys_path(doc_id)):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for doc_id in list(self._docs):
+                self._drop_locked(doc_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.pages_reused + self.pages_rendered
+            return {
+                "enabled": self.enabled,
+                "documents": len(self._docs),
+                "pages": len(self._index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "pages_reused": self.pages_reused,
+                "pages_rendered": self.pages_rendered,
+                "reuse_ratio": round(self.pages_reused / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+            }
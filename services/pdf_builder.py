@@ -1,13 +1,35 @@
 from __future__ import annotations
 
 import io
-from typing import Any, Dict, List, Optional
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Mapping, Optional
 
-from pypdf import PdfReader, PdfWriter
+from PIL import Image
+from pypdf import PageObject, PdfReader, PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    StreamObject,
+)
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.utils import ImageReader
 
+from . import template_map as tm
+from .item_table import Items
+from .page_cache import PageCache, page_keys
+from .profiling import span
+from .result_cache import bytes_digest
+from .text_layout import wrap_text
+from .utils import format_gs, process_pool_context, safe_int
+
 
 # ====== AJUSTES FINOS (calibración) ======
 PAGE_W, PAGE_H = A4
@@ -23,104 +45,585 @@ LOGO_W_PT = 72  # ~2.5 cm
 LOGO_H_PT = 72  # aproximado (se mantiene proporcional si querés)
 LOGO_PAD_RIGHT = 40
 LOGO_PAD_TOP = 40
+LOGO_MAX_PX = 1024  # logos subidos más grandes se achican a este lado máximo (72pt => ~1000 dpi)
+LOGO_FORM_NAME = "logo"
 
 # Tipografía base (ReportLab usa Helvetica; Calibri real requiere registrar TTF)
 FONT_NAME = "Helvetica"
 FONT_SIZE = 8  # más pequeño para que sea legible sin encimar
 
 
-def _wrap_text(c: canvas.Canvas, text: str, max_width: float) -> List[str]:
+PDF_ENGINES = ("batch", "per_item", "parallel", "two_up")
+# Cómo se combina el template con cada overlay (ver write_pdf_from_template)
+PDF_COMPOSE_MODES = ("xobject", "merge")
+TEMPLATE_FORM_NAME = "/DesgloseTemplate"
+PARALLEL_MIN_CHUNK = 50  # menos que esto por proceso no compensa el pickle + arranque
+# Pasadas de compress_identical_objects con páginas del cache (el template / logo llega en 5)
+DEDUPE_PASSES = 8
+
+# Engine "two_up": 2 formularios por hoja con las coordenadas de template_map
+ITEMS_PER_PAGE = {"two_up": 2}
+TWO_UP_BLOCKS = (tm.BLOCK_1, tm.BLOCK_2)
+TWO_UP_LINE_HEIGHT = 10
+TWO_UP_DESC_MAX_LINES = 3
+TWO_UP_BOX_MAX_LINES = 1  # las filas A / B / E del template tienen lugar para 1 renglón
+PAGE_LOGO_FORM_NAME = "page_logo"
+
+
+def pages_for(n_items: int, engine: str = "batch") -> int:
+    """Cantidad de páginas que genera `engine` para `n_items` ítems."""
+    per_page = ITEMS_PER_PAGE.get(engine, 1)
+    return -(-n_items // per_page)
+
+
+def _normalize_logo(logo: bytes) -> bytes:
     """
-    Wrap simple por ancho (sin hyphenation), usando el font ya seteado en canvas.
+    Deja el logo en un formato que ReportLab embebe bien (RGB/RGBA) y lo achica
+    si viene enorme (fotos de celular, PNG de varios MB). Si ya está bien, no se toca.
     """
-    words = (text or "").split()
-    if not words:
-        return [""]
+    with Image.open(io.BytesIO(logo)) as im:
+        im.load()
+        oversized = max(im.size) > LOGO_MAX_PX
+        if not oversized and im.mode in ("RGB", "RGBA", "L"):
+            return logo
 
-    lines: List[str] = []
-    current = words[0]
-    for w in words[1:]:
-        test = current + " " + w
-        if c.stringWidth(test, FONT_NAME, FONT_SIZE) <= max_width:
-            current = test
-        else:
-            lines.append(current)
-            current = w
-    lines.append(current)
-    return lines
+        has_alpha = im.mode in ("RGBA", "LA", "PA") or "transparency" in im.info
+        im2 = im.convert("RGBA" if has_alpha else "RGB")
+        if oversized:
+            im2.thumbnail((LOGO_MAX_PX, LOGO_MAX_PX), Image.LANCZOS)
 
+        out = io.BytesIO()
+        im2.save(out, format="PNG", optimize=True)
+        return out.getvalue()
 
-def build_pdf_from_template(
-    template_pdf_bytes: bytes,
-    items: List[Dict[str, Any]],
+
+@lru_cache(maxsize=8)
+def prepare_logo(logo: bytes) -> Optional[ImageReader]:
+    """
+    Decodifica (y normaliza) un logo una sola vez. Queda en un LRU chico, así el logo
+    default se decodifica una vez por proceso y un logo subido una vez por request.
+    Devuelve None si la imagen no se puede leer.
+    """
+    try:
+        img = ImageReader(io.BytesIO(_normalize_logo(logo)))
+        img.getRGBData()  # fuerza el decode acá (si falla, falla una sola vez)
+        return img
+    except Exception:
+        return None
+
+
+def _define_logo_form(c: canvas.Canvas, logo_img: Optional[ImageReader]) -> bool:
+    """
+    Dibuja el logo una vez como Form XObject del canvas; cada página lo referencia
+    con doForm, así la imagen se embebe (y se hashea) una sola vez por documento.
+    """
+    if logo_img is None:
+        return False
+
+    x_logo = PAGE_W - LOGO_PAD_RIGHT - LOGO_W_PT
+    y_logo = PAGE_H - LOGO_PAD_TOP - LOGO_H_PT
+    c.beginForm(LOGO_FORM_NAME, x_logo, y_logo, x_logo + LOGO_W_PT, y_logo + LOGO_H_PT)
+    c.drawImage(logo_img, x_logo, y_logo, width=LOGO_W_PT, height=LOGO_H_PT, mask="auto")
+    c.endForm()
+    return True
+
+
+def _draw_overlay(
+    c: canvas.Canvas,
+    it: Mapping[str, Any],
     fecha_ddmmyyyy: str,
-    logo_bytes: Optional[bytes],
-    default_logo_bytes: Optional[bytes],
+    with_logo: bool,
+) -> None:
+    """Dibuja el overlay de 1 ítem (logo + fecha + item + descripción) en la página actual del canvas."""
+    c.setFont(FONT_NAME, FONT_SIZE)
+
+    # Logo (Form XObject definido con _define_logo_form)
+    if with_logo:
+        c.doForm(LOGO_FORM_NAME)
+
+    # Header: fecha | item | descripcion
+    nro = it.get("nro", "")
+    try:
+        nro_str = str(int(float(nro)))  # evita "1.0"
+    except Exception:
+        nro_str = str(nro)
+
+    desc = str(it.get("descripcion", "") or "")
+    desc = desc.strip()
+
+    c.drawString(X_FECHA, Y_HEADER, fecha_ddmmyyyy)
+    c.drawString(X_ITEM, Y_HEADER, nro_str)
+
+    # descripción wrap (3 líneas máximo para no encimar; si sobra texto termina en "…")
+    max_width = PAGE_W - X_DESC - 40
+    max_lines = 3
+    line_height = 10
+    for i, line in enumerate(wrap_text(desc, max_width, FONT_NAME, FONT_SIZE, max_lines)):
+        c.drawString(X_DESC, Y_HEADER - i * line_height, line)
+
+
+def _define_page_logo_form(c: canvas.Canvas, logo_img: Optional[ImageReader]) -> bool:
+    """Como _define_logo_form, pero en la caja única por hoja de template_map (PAGE_LOGO_*)."""
+    if logo_img is None:
+        return False
+
+    x, y = tm.PAGE_LOGO_X, tm.PAGE_LOGO_Y + tm.GLOBAL_Y_SHIFT
+    c.beginForm(PAGE_LOGO_FORM_NAME, x, y, x + tm.PAGE_LOGO_W, y + tm.PAGE_LOGO_H)
+    c.drawImage(logo_img, x, y, width=tm.PAGE_LOGO_W, height=tm.PAGE_LOGO_H, mask="auto", preserveAspectRatio=True)
+    c.endForm()
+    return True
+
+
+def _mano_obra_text(it: Mapping[str, Any]) -> str:
+    """Texto de la caja B: el valor tal cual si es texto, en guaraníes si es un monto (vacío si es 0)."""
+    v = it.get("b_mano_obra")
+    if v is None or isinstance(v, str):
+        return (v or "").strip()
+    return format_gs(v) if safe_int(v) else ""
+
+
+def _draw_text_box(c: canvas.Canvas, text: str, x: float, y: float, max_width: float, max_lines: int) -> None:
+    for i, line in enumerate(wrap_text(text, max_width, FONT_NAME, FONT_SIZE, max_lines)):
+        c.drawString(x, y - i * TWO_UP_LINE_HEIGHT, line)
+
+
+def _draw_block(
+    c: canvas.Canvas,
+    it: Mapping[str, Any],
+    fecha_ddmmyyyy: str,
+    block: tm.BlockCoords,
+) -> None:
+    """Dibuja 1 ítem en uno de los 2 formularios de la hoja (header + cajas A / B / E)."""
+    dx = block.x0
+    dy = block.y0 + tm.GLOBAL_Y_SHIFT
+
+    nro = it.get("nro", "")
+    try:
+        nro_str = str(int(float(nro)))  # evita "1.0"
+    except Exception:
+        nro_str = str(nro)
+
+    c.drawString(tm.FECHA_X + dx, tm.FECHA_Y + dy, fecha_ddmmyyyy)
+    c.drawString(tm.ITEM_X + dx, tm.ITEM_Y + dy, nro_str)
+    _draw_text_box(
+        c, str(it.get("descripcion", "") or "").strip(),
+        tm.DESC_X + dx, tm.DESC_Y + dy, tm.DESC_MAX_WIDTH, TWO_UP_DESC_MAX_LINES,
+    )
+
+    # A - herramientas / B - mano de obra / E - materiales (vienen del match)
+    _draw_text_box(
+        c, str(it.get("a_herramientas", "") or "").strip(),
+        tm.A_HERRAMIENTAS_X + dx, tm.A_HERRAMIENTAS_Y + dy, tm.A_HERRAMIENTAS_MAXW, TWO_UP_BOX_MAX_LINES,
+    )
+    _draw_text_box(
+        c, _mano_obra_text(it),
+        tm.B_MANO_OBRA_X + dx, tm.B_MANO_OBRA_Y + dy, tm.B_MANO_OBRA_MAXW, TWO_UP_BOX_MAX_LINES,
+    )
+    _draw_text_box(
+        c, str(it.get("a_materiales", "") or "").strip(),
+        tm.E_MATERIALES_X + dx, tm.E_MATERIALES_Y + dy, tm.E_MATERIALES_MAXW, TWO_UP_BOX_MAX_LINES,
+    )
+
+
+def _overlays_pdf_two_up(
+    items: Items,
+    fecha_ddmmyyyy: str,
+    logo_img: Optional[ImageReader],
+) -> bytes:
+    """Overlays de 2 ítems por hoja (BLOCK_1 / BLOCK_2) en un solo canvas; el logo va 1 vez por hoja."""
+    overlay_buf = io.BytesIO()
+    c = canvas.Canvas(overlay_buf, pagesize=A4)
+    with_logo = _define_page_logo_form(c, logo_img)
+
+    per_page = len(TWO_UP_BLOCKS)
+    for start in range(0, len(items), per_page):
+        c.setFont(FONT_NAME, FONT_SIZE)
+        if with_logo:
+            c.doForm(PAGE_LOGO_FORM_NAME)
+        for block, i in zip(TWO_UP_BLOCKS, range(start, min(start + per_page, len(items)))):
+            _draw_block(c, items[i], fecha_ddmmyyyy, block)
+        c.showPage()
+
+    c.save()
+    return overlay_buf.getvalue()
+
+
+def _render_overlays_two_up(
+    items: Items,
+    fecha_ddmmyyyy: str,
+    logo_img: Optional[ImageReader],
+) -> List[Any]:
+    """Igual que _render_overlays_batch pero con 2 ítems por página (la mitad de páginas y merges)."""
+    return list(PdfReader(io.BytesIO(_overlays_pdf_two_up(items, fecha_ddmmyyyy, logo_img))).pages)
+
+
+def _overlays_pdf(
+    items: Items,
+    fecha_ddmmyyyy: str,
+    logo_img: Optional[ImageReader],
 ) -> bytes:
+    """Todos los overlays en un solo canvas multipágina (1 página por ítem), serializado una vez."""
+    overlay_buf = io.BytesIO()
+    c = canvas.Canvas(overlay_buf, pagesize=A4)
+    with_logo = _define_logo_form(c, logo_img)
+
+    for it in items:
+        _draw_overlay(c, it, fecha_ddmmyyyy, with_logo)
+        c.showPage()
+
+    c.save()
+    return overlay_buf.getvalue()
+
+
+def _render_overlays_batch(
+    items: Items,
+    fecha_ddmmyyyy: str,
+    logo_img: Optional[ImageReader],
+) -> List[Any]:
     """
-    Por cada item genera 1 página:
-      - Usa template PDF como base
-      - Pega overlay con logo + fecha + item + descripción
+    Todos los overlays en un solo canvas multipágina (1 página por ítem):
+    se serializa y se parsea una sola vez en vez de una vez por ítem.
+    """
+    return list(PdfReader(io.BytesIO(_overlays_pdf(items, fecha_ddmmyyyy, logo_img))).pages)
+
+
+def _render_overlay_chunk(
+    items: Items,
+    fecha_ddmmyyyy: str,
+    logo: Optional[bytes],
+) -> bytes:
+    """Worker del ProcessPool: recibe/devuelve solo datos picklables (el logo se decodifica 1 vez por proceso)."""
+    return _overlays_pdf(items, fecha_ddmmyyyy, prepare_logo(logo) if logo else None)
+
+
+def _render_overlays_parallel(
+    items: Items,
+    fecha_ddmmyyyy: str,
+    logo: Optional[bytes],
+    workers: Optional[int],
+    chunk_size: Optional[int],
+) -> Iterator[Any]:
+    """
+    Reparte los ítems en chunks y renderiza los overlays en un ProcessPoolExecutor.
+    Las páginas salen en el orden de los ítems (executor.map respeta el orden), así el
+    merge arranca apenas está el primer chunk mientras los demás se siguen renderizando.
+
+    Cada chunk embebe su propia copia del logo; por eso el chunk default es
+    len(items) / workers (una copia por worker).
     """
+    if not items:
+        return
+
+    workers = workers or os.cpu_count() or 1
+    if not chunk_size:
+        chunk_size = max(PARALLEL_MIN_CHUNK, math.ceil(len(items) / workers))
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), mp_context=process_pool_context()) as ex:
+        for pdf in ex.map(_render_overlay_chunk, chunks, repeat(fecha_ddmmyyyy), repeat(logo)):
+            yield from PdfReader(io.BytesIO(pdf)).pages
+
+
+def _render_overlays_per_item(
+    items: Items,
+    fecha_ddmmyyyy: str,
+    logo_img: Optional[ImageReader],
+) -> List[Any]:
+    """Modo original: un canvas + PdfReader por ítem (se deja como referencia / benchmark)."""
+    pages = []
+    for it in items:
+        overlay_buf = io.BytesIO()
+        c = canvas.Canvas(overlay_buf, pagesize=A4)
+        _draw_overlay(c, it, fecha_ddmmyyyy, _define_logo_form(c, logo_img))
+        c.showPage()
+        c.save()
+        overlay_buf.seek(0)
+        pages.append(PdfReader(overlay_buf).pages[0])
+    return pages
+
+
+def _template_base_page(template_pdf_bytes: Optional[bytes], template_page: Optional[PageObject]) -> PageObject:
+    """Primera página del template: la ya parseada si viene, si no se parsea desde los bytes."""
+    if template_page is not None:
+        return template_page
+    if not template_pdf_bytes:
+        raise ValueError("Falta el template PDF.")
+
     base_reader = PdfReader(io.BytesIO(template_pdf_bytes))
     if len(base_reader.pages) < 1:
         raise ValueError("El template PDF no tiene páginas.")
+    return base_reader.pages[0]  # siempre usamos la primera página como “molde”
+
+
+def compose_page(writer: PdfWriter, base_page: PageObject, overlay_page: PageObject) -> PageObject:
+    """
+    Agrega al writer una página nueva = template + overlay.
+
+    Ojo: writer.add_page(base_page) / base_page.clone(writer) devuelven siempre la misma
+    página clonada (pypdf cachea el clon), así que hacer merge sobre eso acumula los
+    overlays de todos los ítems en un único contenido compartido por todas las hojas.
+    Acá cada hoja arranca en blanco y tiene su propio contenido.
+    """
+    page = writer.add_blank_page(width=base_page.mediabox.width, height=base_page.mediabox.height)
+    page.merge_page(base_page)
+    page.merge_page(overlay_page)
+    return page
+
+
+def template_form(writer: PdfWriter, base_page: PageObject) -> IndirectObject:
+    """
+    La página del template como Form XObject, agregada una sola vez al writer: su
+    contenido y sus recursos (fonts, ExtGState) quedan en un único objeto que todas
+    las hojas referencian con `Do`.
+    """
+    contents = base_page.get_contents()
+    form = DecodedStreamObject()
+    form.set_data(contents.get_data() if contents is not None else b"")
+    form.update({
+        NameObject("/Type"): NameObject("/XObject"),
+        NameObject("/Subtype"): NameObject("/Form"),
+        NameObject("/BBox"): ArrayObject(base_page.mediabox),
+    })
+    resources = base_page.get("/Resources")
+    if resources is not None:
+        form[NameObject("/Resources")] = resources.clone(writer)
+    return _add_indirect_object(writer, form.flate_encode())
+
+
+def _add_indirect_object(writer: PdfWriter, obj: StreamObject) -> IndirectObject:
+    """
+    Agrega `obj` al writer como objeto indirecto y devuelve su referencia.
+
+    pypdf no tiene API pública para esto (revisado con pypdf 6.20.1): un stream puesto
+    directo en /Resources de una página se escribe inline, sin referencia, y el PDF queda
+    inválido. Es el único uso de internals de pypdf en el módulo; si cambia de una versión
+    a otra, se rompe acá.
+    """
+    return writer._add_object(obj)
+
+
+def compose_page_xobject(
+    writer: PdfWriter,
+    form_ref: IndirectObject,
+    base_page: PageObject,
+    overlay_page: PageObject,
+) -> PageObject:
+    """
+    Agrega al writer una página nueva = `Do` del template (ver template_form) + el
+    contenido del overlay. Se ve igual que compose_page, pero la hoja solo lleva su
+    overlay; los fonts / logo del overlay salen del mismo PDF de overlays, así que
+    pypdf los clona una vez y todas las hojas comparten esos objetos.
+    """
+    page = writer.add_page(overlay_page)
+    page.mediabox = base_page.mediabox
+
+    # Recursos propios de la hoja (el dict del overlay puede ser compartido entre páginas)
+    resources = DictionaryObject(page.get("/Resources", DictionaryObject()).get_object())
+    xobjects = DictionaryObject(resources.get("/XObject", DictionaryObject()).get_object())
+    xobjects[NameObject(TEMPLATE_FORM_NAME)] = form_ref
+    resources[NameObject("/XObject")] = xobjects
+    page[NameObject("/Resources")] = resources
+
+    overlay = page.get_contents()
+    content = DecodedStreamObject()
+    content.set_data(
+        b"q " + TEMPLATE_FORM_NAME.encode("ascii") + b" Do Q\nq\n"
+        + (overlay.get_data() if overlay is not None else b"")
+        + b"\nQ\n"
+    )
+    page.replace_contents(content.flate_encode())
+    return page
 
-    base_page = base_reader.pages[0]  # siempre usamos la primera página como “molde”
+
+def _choose_logo(
+    logo_bytes: Optional[bytes],
+    default_logo_bytes: Optional[bytes],
+    default_logo_img: Optional[ImageReader],
+) -> Optional[ImageReader]:
+    """Logo subido si hay; si no, el default (ya decodificado si viene del registry de assets)."""
+    if logo_bytes:
+        return prepare_logo(logo_bytes)
+    if default_logo_img is not None:
+        return default_logo_img
+    if default_logo_bytes:
+        return prepare_logo(default_logo_bytes)
+    return None
+
+
+def write_pdf_from_template(
+    sink: BinaryIO,
+    template_pdf_bytes: Optional[bytes],
+    items: Items,
+    fecha_ddmmyyyy: str,
+    logo_bytes: Optional[bytes],
+    default_logo_bytes: Optional[bytes],
+    engine: str = "batch",
+    template_page: Optional[PageObject] = None,
+    default_logo_img: Optional[ImageReader] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    page_cache: Optional[PageCache] = None,
+    report: Optional[Dict[str, int]] = None,
+    compose: str = "xobject",
+    template_digest: Optional[str] = None,
+) -> int:
+    """
+    Igual que build_pdf_from_template pero escribe el PDF directo en `sink`
+    (archivo abierto en "wb", respuesta en streaming, etc.) sin armar una copia
+    completa en memoria. Devuelve la cantidad de páginas escritas.
+
+    Por cada item genera 1 página (o media, con "two_up"):
+      - Usa template PDF como base
+      - Pega overlay con logo + fecha + item + descripción
+
+    engine:
+      - "batch": todos los overlays en un único canvas, merge en una sola pasada (default)
+      - "per_item": un canvas/PDF temporal por ítem (modo original)
+      - "parallel": overlays por chunks en varios procesos (workers / chunk_size; default
+        cpu_count y len(items) / workers). Mismas páginas que "batch".
+      - "two_up": 2 ítems por página, uno en cada formulario del template (coordenadas de
+        services.template_map), con las cajas A / B / E completas. La mitad de páginas.
+
+    template_page / default_logo_img: versiones ya parseadas/decodificadas (ver services.assets);
+    si vienen, no se re-parsea el template ni se decodifica el logo default.
+
+    progress: si viene, se llama con la cantidad de páginas ya armadas.
+
+    page_cache: si viene, las páginas cuyo contenido (ítems de la hoja, fecha, logo, template,
+    engine) ya se generó antes se copian del PDF anterior y solo se renderizan las demás
+    (template / logo / fuentes de esas páginas quedan una sola vez en el PDF, ver
+    DEDUPE_PASSES); el PDF nuevo queda guardado para la próxima. El template se
+    identifica por template_digest (p. ej. TemplateAsset.digest) o por el hash de
+    template_pdf_bytes; si no hay ninguno de los dos, no se usa el cache.
+
+    report: si viene, se completa con pages_reused / pages_rendered.
+
+    compose:
+      - "xobject": el template va una sola vez en el PDF (Form XObject) y cada hoja lo
+        referencia + su overlay (default; PDF mucho más chico y merge más rápido)
+      - "merge": cada hoja lleva su propia copia del contenido del template (merge_page)
+    """
+    if engine not in PDF_ENGINES:
+        raise ValueError(f"engine inválido: {engine!r} (opciones: {', '.join(PDF_ENGINES)})")
+    if compose not in PDF_COMPOSE_MODES:
+        raise ValueError(f"compose inválido: {compose!r} (opciones: {', '.join(PDF_COMPOSE_MODES)})")
+
+    base_page = _template_base_page(template_pdf_bytes, template_page)
     writer = PdfWriter()
 
-    chosen_logo = logo_bytes or default_logo_bytes
+    logo_img = _choose_logo(logo_bytes, default_logo_bytes, default_logo_img)
 
-    for it in items:
-        # 1) Crear overlay PDF (1 página)
-        overlay_buf = io.BytesIO()
-        c = canvas.Canvas(overlay_buf, pagesize=A4)
+    per_page = ITEMS_PER_PAGE.get(engine, 1)
+    keys: List[str] = []
+    cached_pages: List[Optional[PageObject]] = [None] * pages_for(len(items), engine)
+    to_render = items
+    # El cache de páginas necesita saber qué template es: sin bytes ni digest no se usa
+    template_digest = template_digest or (bytes_digest(template_pdf_bytes) if template_pdf_bytes else None)
+    use_page_cache = page_cache is not None and page_cache.enabled and template_digest is not None
+    if use_page_cache:
+        keys = page_keys(
+            items, per_page, fecha_ddmmyyyy,
+            bytes_digest(logo_bytes or default_logo_bytes), template_digest, f"{engine}/{compose}",
+        )
+        with span("page_cache_lookup"):
+            cached_pages = page_cache.lookup(keys)
+        if any(p is not None for p in cached_pages):
+            # Solo los ítems de las páginas que faltan (en dicts: se pueden mandar a otros procesos)
+            to_render = [
+                dict(items[i])
+                for pos, page in enumerate(cached_pages) if page is None
+                for i in range(pos * per_page, min((pos + 1) * per_page, len(items)))
+            ]
 
-        c.setFont(FONT_NAME, FONT_SIZE)
+    # (con "parallel" el render sigue en los procesos mientras se hace el merge)
+    with span("overlay_render"):
+        if engine == "batch":
+            overlay_pages = _render_overlays_batch(to_render, fecha_ddmmyyyy, logo_img)
+        elif engine == "parallel":
+            # A los procesos se les pasan bytes (ImageReader no es picklable)
+            overlay_pages = _render_overlays_parallel(
+                to_render, fecha_ddmmyyyy, logo_bytes or default_logo_bytes, workers, chunk_size
+            )
+        elif engine == "two_up":
+            overlay_pages = _render_overlays_two_up(to_render, fecha_ddmmyyyy, logo_img)
+        else:
+            overlay_pages = _render_overlays_per_item(to_render, fecha_ddmmyyyy, logo_img)
 
-        # Logo
-        if chosen_logo:
-            try:
-                img = ImageReader(io.BytesIO(chosen_logo))
-                x_logo = PAGE_W - LOGO_PAD_RIGHT - LOGO_W_PT
-                y_logo = PAGE_H - LOGO_PAD_TOP - LOGO_H_PT
-                c.drawImage(img, x_logo, y_logo, width=LOGO_W_PT, height=LOGO_H_PT, mask="auto")
-            except Exception:
-                pass
-
-        # Header: fecha | item | descripcion
-        nro = it.get("nro", "")
-        try:
-            nro_str = str(int(float(nro)))  # evita "1.0"
-        except Exception:
-            nro_str = str(nro)
-
-        desc = str(it.get("descripcion", "") or "")
-        desc = desc.strip()
-
-        c.drawString(X_FECHA, Y_HEADER, fecha_ddmmyyyy)
-        c.drawString(X_ITEM, Y_HEADER, nro_str)
-
-        # descripción wrap (2-3 líneas máximo para no encimar)
-        max_width = PAGE_W - X_DESC - 40
-        lines = _wrap_text(c, desc, max_width=max_width)
-        max_lines = 3
-        line_height = 10
-        for i, line in enumerate(lines[:max_lines]):
-            c.drawString(X_DESC, Y_HEADER - i * line_height, line)
+    overlays = iter(overlay_pages)
+    form_ref: Optional[IndirectObject] = None
+    reused = 0
+    n = 0
+    with span("merge"):
+        for n, cached in enumerate(cached_pages, start=1):
+            if cached is not None:
+                writer.add_page(cached)
+                reused += 1
+            elif compose == "xobject":
+                if form_ref is None:
+                    form_ref = template_form(writer, base_page)
+                compose_page_xobject(writer, form_ref, base_page, next(overlays))
+            else:
+                compose_page(writer, base_page, next(overlays))
+            if progress is not None:
+                progress(n)
 
-        c.showPage()
-        c.save()
-        overlay_buf.seek(0)
+    if reused:
+        # Las páginas reusadas traen sus propias copias del template / logo / fuentes. Cada
+        # pasada une un nivel (un dict es igual a otro recién cuando sus hijos ya se unieron)
+        with span("dedupe"):
+            for _ in range(DEDUPE_PASSES):
+                writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=True)
+
+    with span("serialize"):
+        if use_page_cache:
+            with page_cache.recording(sink, keys) as out:
+                writer.write(out)
+            page_cache.count(reused, n - reused)
+        else:
+            writer.write(sink)
 
-        overlay_reader = PdfReader(overlay_buf)
-        overlay_page = overlay_reader.pages[0]
+    if report is not None:
+        report["pages_reused"] = reused
+        report["pages_rendered"] = n - reused
+    return n
 
-        # 2) Clonar página template y merge overlay
-        new_page = base_page  # pypdf maneja copy internamente al add_page
-        writer.add_page(new_page)
-        writer.pages[-1].merge_page(overlay_page)
 
+def build_pdf_from_template(
+    template_pdf_bytes: Optional[bytes],
+    items: Items,
+    fecha_ddmmyyyy: str,
+    logo_bytes: Optional[bytes],
+    default_logo_bytes: Optional[bytes],
+    engine: str = "batch",
+    template_page: Optional[PageObject] = None,
+    default_logo_img: Optional[ImageReader] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    page_cache: Optional[PageCache] = None,
+    report: Optional[Dict[str, int]] = None,
+    compose: str = "xobject",
+    template_digest: Optional[str] = None,
+) -> bytes:
+    """PDF completo en memoria (ver write_pdf_from_template para los parámetros)."""
     out_buf = io.BytesIO()
-    writer.write(out_buf)
-    return out_buf.getvalue()
\ No newline at end of file
+    write_pdf_from_template(
+        out_buf,
+        template_pdf_bytes=template_pdf_bytes,
+        items=items,
+        fecha_ddmmyyyy=fecha_ddmmyyyy,
+        logo_bytes=logo_bytes,
+        default_logo_bytes=default_logo_bytes,
+        engine=engine,
+        template_page=template_page,
+        default_logo_img=default_logo_img,
+        progress=progress,
+        workers=workers,
+        chunk_size=chunk_size,
+        page_cache=page_cache,
+        report=report,
+        compose=compose,
+        template_digest=template_digest,
+    )
+    return out_buf.getvalue()
@@ -3,7 +3,6 @@ from typing import Optional
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
 
 from pypdf import PdfReader, PdfWriter
 
@@ -14,26 +13,8 @@ from config import (
     FONT_NAME, FONT_SIZE,
     DESC_MAX_WIDTH, LINE_HEIGHT,
 )
-
-
-def _wrap_text(c: canvas.Canvas, text: str, max_width: float):
-    """
-    Parte el texto en líneas usando el ancho real de la fuente actual.
-    """
-    words = text.split()
-    lines = []
-    cur = []
-    for w in words:
-        test = (" ".join(cur + [w])).strip()
-        if c.stringWidth(test, FONT_NAME, FONT_SIZE) <= max_width:
-            cur.append(w)
-        else:
-            if cur:
-                lines.append(" ".join(cur))
-            cur = [w]
-    if cur:
-        lines.append(" ".join(cur))
-    return lines
+from .pdf_builder import compose_page, prepare_logo
+from .text_layout import wrap_text
 
 
 def build_pdf_from_template_simple(
@@ -53,44 +34,47 @@ def build_pdf_from_template_simple(
 
     writer = PdfWriter()
 
-    for desc in descriptions:
-        # 1) overlay en memoria
-        packet = io.BytesIO()
-        c = canvas.Canvas(packet, pagesize=A4)
+    # 1) overlays: un solo canvas multipágina, 1 página por descripción
+    packet = io.BytesIO()
+    c = canvas.Canvas(packet, pagesize=A4)
+
+    # Logo: se decodifica una vez y se dibuja como Form XObject compartido por todas las hojas
+    img = None
+    if logo_path:
+        try:
+            with open(logo_path, "rb") as f:
+                img = prepare_logo(f.read())
+        except OSError:
+            # si el logo falla, no rompemos todo el PDF
+            img = None
+    if img is not None:
+        c.beginForm("logo")
+        c.drawImage(img, LOGO_X, LOGO_Y, width=LOGO_W, height=LOGO_H, mask="auto")
+        c.endForm()
 
+    for desc in descriptions:
         # Fuente (sin calibri.ttf -> Helvetica estable)
         c.setFont(FONT_NAME, FONT_SIZE)
 
         # Logo (1 por hoja)
-        if logo_path:
-            try:
-                img = ImageReader(logo_path)
-                c.drawImage(img, LOGO_X, LOGO_Y, width=LOGO_W, height=LOGO_H, mask="auto")
-            except Exception:
-                # si el logo falla, no rompemos todo el PDF
-                pass
-
-        # Descripción (solo esto)
-        lines = _wrap_text(c, desc, DESC_MAX_WIDTH)
+        if img is not None:
+            c.doForm("logo")
+
+        # Descripción (solo esto); 3 renglones como máximo para no invadir otras celdas
         y = DESC_Y
-        for line in lines[:3]:  # límite razonable para no invadir otras celdas
+        for line in wrap_text(desc, DESC_MAX_WIDTH, FONT_NAME, FONT_SIZE, 3):
             c.drawString(DESC_X, y, line)
             y -= LINE_HEIGHT
 
         c.showPage()
-        c.save()
-        packet.seek(0)
-
-        overlay_reader = PdfReader(packet)
-        overlay_page = overlay_reader.pages[0]
 
-        # 2) merge overlay sobre el template
-        new_page = base_page  # pypdf permite copiar con merge
-        # Para no mutar el base_page original, lo clonamos:
-        new_page = new_page.clone()
-        new_page.merge_page(overlay_page)
+    c.save()
+    packet.seek(0)
 
-        writer.add_page(new_page)
+    # 2) merge overlay sobre el template
+    for overlay_page in PdfReader(packet).pages:
+        # Página nueva por descripción (no mutar el base_page ni compartir su clon)
+        compose_page(writer, base_page, overlay_page)
 
     with open(out_pdf_path, "wb") as f:
-        writer.write(f)
\ No newline at end of file
+        writer.write(f)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+log = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("desglose_trace", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    depth: int
+    ms: float = 0.0
+    blocks: int = 0  # bloques de memoria netos asignados (sys.getallocatedblocks)
+    mem_kib: Optional[float] = None  # solo si tracemalloc está activo
+
+
+@dataclass
+class Trace:
+    """
+    Tiempos de una generación: lista de spans en el orden en que terminaron.
+    Un span con el mismo nombre puede aparecer varias veces (se suman en totals()).
+    """
+
+    name: str
+    spans: List[Span] = field(default_factory=list)
+    t0: float = field(default_factory=time.perf_counter)
+    elapsed_ms: float = 0.0
+    _depth: int = 0
+
+    def totals(self) -> Dict[str, float]:
+        """ms por nombre de span (sumados), más "total"."""
+        out: Dict[str, float] = {}
+        for s in self.spans:
+            out[s.name] = round(out.get(s.name, 0.0) + s.ms, 2)
+        out["total"] = round(self.elapsed_ms or (time.perf_counter() - self.t0) * 1000.0, 2)
+        return out
+
+    def summary(self) -> str:
+        parts = []
+        for s in self.spans:
+            mem = f", {s.mem_kib:+.0f} KiB" if s.mem_kib is not None else ""
+            parts.append(f"{'  ' * s.depth}{s.name}={s.ms:.1f}ms ({s.blocks:+d} bloques{mem})")
+        return f"{self.name}: {self.totals()['total']:.1f}ms\n" + "\n".join(parts)
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Valor del header Server-Timing (https://www.w3.org/TR/server-timing/) para Trace.totals()."""
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings.items())
+
+
+@contextmanager
+def trace(name: str) -> Iterator[Trace]:
+    """Activa un Trace para el contexto actual (thread / request); los span() de adentro se anotan ahí."""
+    tr = Trace(name)
+    token = _current.set(tr)
+    try:
+        yield tr
+    finally:
+        tr.elapsed_ms = (time.perf_counter() - tr.t0) * 1000.0
+        _current.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Mide un tramo (reloj monotónico + bloques de memoria asignados) dentro del Trace activo.
+    Sin Trace activo no hace nada (se puede dejar en el código sin costo).
+    """
+    tr = _current.get()
+    if tr is None:
+        yield
+        return
+
+    s = Span(name=name, depth=tr._depth)
+    tracing = tracemalloc.is_tracing()
+    mem0 = tracemalloc.get_traced_memory()[0] if tracing else 0
+    blocks0 = sys.getallocatedblocks()
+    tr._depth += 1
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        s.ms = (time.perf_counter() - t0) * 1000.0
+        tr._depth -= 1
+        s.blocks = sys.getallocatedblocks() - blocks0
+        if tracing:
+            s.mem_kib = (tracemalloc.get_traced_memory()[0] - mem0) / 1024.0
+        tr.spans.append(s)
+
+
+@contextmanager
+def profile_to(out_prefix: Path, top: int = 40) -> Iterator[None]:
+    """
+    cProfile + tracemalloc del bloque (thread actual) para diagnosticar UNA generación:
+      <prefix>.prof          -> pstats (snakeviz / python -m pstats)
+      <prefix>_cpu.txt       -> top funciones por tiempo acumulado
+      <prefix>_alloc.txt     -> top líneas por memoria asignada
+    Es caro (varias veces más lento) y tracemalloc es de todo el proceso: mientras corre
+    también frena a los demás jobs. Usar solo a pedido.
+    """
+    out_prefix = Path(out_prefix)
+    out_prefix.parent.mkdir(parents=True, exist_ok=True)
+
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start(10)
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+        prof.dump_stats(str(out_prefix) + ".prof")
+
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+        Path(str(out_prefix) + "_cpu.txt").write_text(buf.getvalue(), encoding="utf-8")
+
+        lines = [str(stat) for stat in snapshot.statistics("lineno")[:top]]
+        Path(str(out_prefix) + "_alloc.txt").write_text("\n".join(lines), encoding="utf-8")
+
+        log.info("Perfil guardado en %s.prof (+ _cpu.txt, _alloc.txt)", out_prefix)
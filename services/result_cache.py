@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+log = logging.getLogger(__name__)
+
+_SUFFIX = ".pdf"
+
+# Subir si cambia cómo se dibuja / arma el PDF (overlay, template_map, compose, ...): los PDFs
+# guardados con la versión anterior dejan de coincidir y se van por LRU / TTL. Va junto con
+# page_cache._KEY_VERSION.
+_KEY_VERSION = "1"
+
+
+def bytes_digest(data: Optional[bytes]) -> str:
+    """sha256 hex de unos bytes ("" si no hay)."""
+    return hashlib.sha256(data).hexdigest() if data else ""
+
+
+def result_key(
+    excel_bytes: bytes,
+    logo_digest: str,
+    fecha_ddmmyyyy: str,
+    template_digest: str,
+    match_version: str = "",
+    engine: str = "",
+) -> str:
+    """
+    Clave del PDF resultante: todo lo que cambia el PDF generado.
+
+    logo_digest / template_digest: bytes_digest del logo efectivo (subido o default) y del
+    template; match_version: MatchTable.version si el PDF usa match.xlsx; engine: el motor
+    de PDF (two_up genera otro documento).
+    """
+    h = hashlib.sha256()
+    for part in (
+        _KEY_VERSION,
+        bytes_digest(excel_bytes),
+        logo_digest,
+        fecha_ddmmyyyy,
+        template_digest,
+        match_version,
+        engine,
+    ):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+@dataclass
+class _Entry:
+    size: int
+    stored_at: float
+
+
+class ResultCache:
+    """
+    PDFs ya generados en disco (`<dir>/<clave>.pdf`), para devolver al instante
+    un re-upload del mismo Excel con la misma fecha / logo / template.
+
+    - LRU por tamaño total: al pasar `max_bytes` se borran los menos usados.
+    - TTL: una entrada más vieja que `ttl_seconds` cuenta como miss y se borra.
+    - Al arrancar se indexa lo que ya hay en el directorio (sobrevive reinicios).
+
+    max_bytes = 0 desactiva el cache (get siempre miss, put no guarda nada).
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, ttl_seconds: float):
+        self.dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._total = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_served = 0
+
+        if self.enabled:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._scan()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> Path:
+        return self.dir / f"{key}{_SUFFIX}"
+
+    def _scan(self) -> None:
+        found = []
+        for p in self.dir.glob(f"*{_SUFFIX}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            found.append((st.st_mtime, p.stem, st.st_size))
+
+        # El más viejo primero (= el primero en salir por LRU)
+        for mtime, key, size in sorted(found):
+            self._entries[key] = _Entry(size=size, stored_at=mtime)
+            self._total += size
+        self._evict_locked()
+
+    def get(self, key: str) -> Optional[Path]:
+        """Ruta del PDF cacheado (y cuenta los bytes como servidos), o None si no está / venció."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry.stored_at > self.ttl_seconds:
+                self._drop_locked(key)
+                entry = None
+
+            path = self._path(key)
+            if entry is not None and not path.exists():
+                # Alguien lo borró del disco por fuera
+                self._drop_locked(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_served += entry.size
+            return path
+
+    def put(self, key: str, pdf_path: Path) -> None:
+        """
+        Guarda una copia de `pdf_path` (hard link si se puede, así no se duplican bytes).
+        El archivo original queda intacto: el job lo puede borrar cuando vence.
+        """
+        if not self.enabled:
+            return
+
+        size = os.path.getsize(pdf_path)
+        if size > self.max_bytes:
+            return
+
+        dest = self._path(key)
+        tmp = dest.with_suffix(".part")
+        try:
+            try:
+                os.link(pdf_path, tmp)
+            except OSError:
+                shutil.copyfile(pdf_path, tmp)
+            os.replace(tmp, dest)
+        except OSError as e:
+            log.warning("No se pudo guardar %s en el cache de resultados: %s", pdf_path, e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total -= old.size
+            self._entries[key] = _Entry(size=size, stored_at=time.time())
+            self._total += size
+            self.stores += 1
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        now = time.time()
+        expired = [k for k, e in self._entries.items() if now - e.stored_at > self.ttl_seconds]
+        for k in expired:
+            self._drop_locked(k)
+            self.evictions += 1
+
+        while self._total > self.max_bytes and self._entries:
+            k = next(iter(self._entries))
+            self._drop_locked(k)
+            self.evictions += 1
+
+    def _drop_locked(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total -= entry.size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            for k in list(self._entries):
+                self._drop_locked(k)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "bytes_served": self.bytes_served,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
@@ -7,20 +7,20 @@ class BlockCoords:
 
 # Dos formularios por hoja
 BLOCK_1 = BlockCoords(x0=0, y0=0)
-BLOCK_2 = BlockCoords(x0=0, y0=-395)
+BLOCK_2 = BlockCoords(x0=0, y0=-322)  # el 2º formulario empieza 322pt más abajo
 
 # Bajá TODO el overlay un poquito si está "muy arriba"
 GLOBAL_Y_SHIFT = -18  # probá -12, -18, -24
 
 # Header (fila 3)
-FECHA_X = 55
-FECHA_Y = 785
+FECHA_X = 74
+FECHA_Y = 688
 
-ITEM_X = 250
-ITEM_Y = 785
+ITEM_X = 241
+ITEM_Y = 688
 
-DESC_X = 305
-DESC_Y = 785
+DESC_X = 281
+DESC_Y = 697
 DESC_MAX_WIDTH = 235
 
 # Logo único por hoja (arriba derecha)
@@ -29,15 +29,15 @@ PAGE_LOGO_Y = 812
 PAGE_LOGO_W = 140
 PAGE_LOGO_H = 45
 
-# Cajas de texto
-A_HERRAMIENTAS_X = 70
-A_HERRAMIENTAS_Y = 625
-A_HERRAMIENTAS_MAXW = 470
+# Cajas de texto (1ª columna de la fila en blanco de cada sección: 1 renglón)
+A_HERRAMIENTAS_X = 74
+A_HERRAMIENTAS_Y = 631
+A_HERRAMIENTAS_MAXW = 160
 
-B_MANO_OBRA_X = 70
-B_MANO_OBRA_Y = 545
-B_MANO_OBRA_MAXW = 470
+B_MANO_OBRA_X = 74
+B_MANO_OBRA_Y = 592
+B_MANO_OBRA_MAXW = 160
 
-E_MATERIALES_X = 70
-E_MATERIALES_Y = 445
-E_MATERIALES_MAXW = 470
\ No newline at end of file
+E_MATERIALES_X = 74
+E_MATERIALES_Y = 535
+E_MATERIALES_MAXW = 160
\ No newline at end of file
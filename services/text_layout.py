@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, Tuple
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+ELLIPSIS = "…"  # existe en WinAnsi: Helvetica lo dibuja sin registrar nada
+_MAX_WORDS_PER_FONT = 50000  # tope de la tabla de anchos por palabra (por font/tamaño)
+
+
+@lru_cache(maxsize=16)
+def _width_table(font_name: str, font_size: float) -> Dict[str, float]:
+    """Anchos de palabra ya medidos para un font/tamaño (se va llenando a medida que aparecen)."""
+    return {}
+
+
+def _measure(table: Dict[str, float], s: str, font_name: str, font_size: float) -> float:
+    w = table.get(s)
+    if w is None:
+        if len(table) >= _MAX_WORDS_PER_FONT:
+            table.clear()
+        w = table[s] = stringWidth(s, font_name, font_size)
+    return w
+
+
+def _ellipsize(line: str, max_width: float, font_name: str, font_size: float, ellipsis: str) -> str:
+    """`line` + ellipsis, recortando caracteres del final hasta que entre en max_width."""
+    table = _width_table(font_name, font_size)
+    ell_w = _measure(table, ellipsis, font_name, font_size)
+    char_w = [_measure(table, ch, font_name, font_size) for ch in line]
+
+    total = sum(char_w)
+    end = len(line)
+    while end > 0 and total + ell_w > max_width:
+        end -= 1
+        total -= char_w[end]
+    return line[:end].rstrip() + ellipsis
+
+
+@lru_cache(maxsize=4096)
+def wrap_text(
+    text: str,
+    max_width: float,
+    font_name: str,
+    font_size: float,
+    max_lines: int = 0,
+    ellipsis: str = ELLIPSIS,
+) -> Tuple[str, ...]:
+    """
+    Parte `text` en renglones de hasta `max_width` puntos (por palabras, sin hyphenation).
+
+    Mismo resultado que medir con stringWidth la línea acumulada palabra por palabra,
+    pero cada palabra se mide una sola vez por font/tamaño y el ancho de la línea se
+    va sumando (lineal en el largo del texto). Una palabra más ancha que max_width va
+    sola en su renglón (igual que antes).
+
+    max_lines > 0: si sobra texto, el último renglón termina en `ellipsis`.
+    Memoizado: la misma descripción en el mismo recuadro se parte una sola vez.
+    Sin texto devuelve ("",).
+    """
+    words = (text or "").split()
+    if not words:
+        return ("",)
+
+    table = _width_table(font_name, font_size)
+    space_w = _measure(table, " ", font_name, font_size)
+
+    lines = []
+    current = [words[0]]
+    current_w = _measure(table, words[0], font_name, font_size)
+    truncated = False
+
+    for word in words[1:]:
+        word_w = _measure(table, word, font_name, font_size)
+        if current_w + space_w + word_w <= max_width:
+            current.append(word)
+            current_w += space_w + word_w
+            continue
+
+        lines.append(" ".join(current))
+        if max_lines and len(lines) == max_lines:
+            truncated = True
+            break
+        current = [word]
+        current_w = word_w
+    else:
+        lines.append(" ".join(current))
+
+    if truncated:
+        lines[-1] = _ellipsize(lines[-1], max_width, font_name, font_size, ellipsis)
+    return tuple(lines)
+
+
+def layout_cache_info():
+    return wrap_text.cache_info()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Any, List
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _strip_accents_char(ch: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", ch) if unicodedata.category(c) != "Mn")
+
+
+class _AccentTable(dict):
+    """
+    Tabla para str.translate: cada caracter -> su forma NFD sin marcas Mn
+    (á->a, ñ->n, ẽ->e, ỹ->y, marca combinante suelta -> "", g̃ -> g).
+
+    Las letras latinas se precalculan; cualquier otro caracter se resuelve la primera
+    vez que aparece y queda memorizado. Da lo mismo que NFD + quitar Mn sobre el string
+    entero: lo único que cambia es el orden de marcas no-ASCII, que igual terminan como
+    espacio en la regex siguiente.
+    """
+
+    def __missing__(self, cp: int) -> str:
+        mapped = _strip_accents_char(chr(cp))
+        self[cp] = mapped
+        return mapped
+
+
+def _build_accent_table() -> _AccentTable:
+    table = _AccentTable()
+    for lo, hi in ((0x00C0, 0x024F), (0x0300, 0x036F), (0x1E00, 0x1EFF)):
+        for cp in range(lo, hi + 1):
+            table[cp] = _strip_accents_char(chr(cp))
+    return table
+
+
+_ACCENT_TABLE = _build_accent_table()
+
+
+@lru_cache(maxsize=65536)
+def _norm_str(s: str) -> str:
+    s = s.lower()
+    if not s.isascii():
+        s = s.translate(_ACCENT_TABLE)
+    return " ".join(_NON_ALNUM_RE.sub(" ", s).split())
+
+
+def norm_text(v: Any) -> str:
+    """
+    Normaliza: lower, sin acentos, solo alfanum + espacio (un solo espacio entre palabras).
+
+    Compartida por la detección de encabezados (extract_items) y el match (match_engine).
+    Camino rápido para texto ASCII, tabla precalculada para acentos latinos y LRU acotado
+    para textos repetidos (encabezados, descripciones que se repiten).
+    """
+    if v is None:
+        return ""
+    return _norm_str(v if isinstance(v, str) else str(v))
+
+
+def tokens(v: Any) -> List[str]:
+    """Palabras del texto normalizado."""
+    s = norm_text(v)
+    if not s:
+        return []
+    return s.split(" ")
+
+
+def norm_cache_info():
+    return _norm_str.cache_info()
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from .text_norm import norm_text
+
+if TYPE_CHECKING:
+    from .match_engine import MatchRow
+
+CHAR_NGRAMS = (3, 4)  # n-gramas de caracteres por palabra (con un espacio a cada lado)
+_WORD_PREFIX = "w:"  # separa palabras de n-gramas (norm_text no deja ":" en el texto)
+
+# Features presentes en más de max(DENSE_MIN_ROWS, n_filas * DENSE_MIN_FRACTION) filas
+# ("de", " co", "ion"...) van por un producto denso (BLAS); el resto, por índice invertido.
+DENSE_MIN_ROWS = 32
+DENSE_MIN_FRACTION = 0.03  # medido: más denso gasta en BLAS, menos denso en pares
+_CHUNK_CELLS = 8_000_000  # tamaño del bloque de scores (ítems x filas) por vuelta
+
+
+def _features(desc_norm: str) -> List[str]:
+    """Palabras + n-gramas de caracteres de cada palabra (' cable ' -> ' ca', 'cab', ..., ' cab', ...)."""
+    words = desc_norm.split()
+    feats = [_WORD_PREFIX + w for w in words]
+    lo, hi = CHAR_NGRAMS
+    for w in words:
+        padded = f" {w} "
+        if len(padded) <= lo:
+            feats.append(padded)
+            continue
+        for n in range(lo, hi + 1):
+            feats.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return feats
+
+
+class TfidfMatcher:
+    """
+    Similitud coseno TF-IDF (palabras + n-gramas de caracteres) contra las filas de match.xlsx.
+
+    A diferencia de KeywordMatcher (tokens exactos), los n-gramas toleran plurales, typos
+    y palabras pegadas: "capacitores" sigue pareciéndose a "capacitor". El score es el
+    coseno en [0, 1], así que el mismo `threshold` decide cuándo cae a DEFAULT.
+
+    La matriz de filas se arma una vez. best_matches puntúa todos los ítems en bloques:
+    features comunes con un producto denso (numpy / BLAS) y el resto expandiendo los
+    pares (ítem, fila) del índice invertido y sumándolos con bincount. Mismo resultado
+    que el producto X · Pᵀ completo; ante empate gana la primera fila.
+    """
+
+    def __init__(self, rows: Sequence["MatchRow"]):
+        self.rows = list(rows)
+        n = len(self.rows)
+
+        docs = [Counter(_features(r.desc_norm)) for r in self.rows]
+        df: Counter = Counter()
+        for d in docs:
+            df.update(d.keys())
+
+        self._vocab: Dict[str, int] = {f: i for i, f in enumerate(df)}
+        self._idf = np.array([math.log((1 + n) / (1 + df[f])) + 1.0 for f in df], dtype=np.float32)
+        # Features que ninguna fila tiene: no suman al producto, pero sí a la norma del ítem
+        self._idf_unseen = math.log(1 + n) + 1.0
+
+        min_dense = max(DENSE_MIN_ROWS, int(n * DENSE_MIN_FRACTION))
+        dense_ids = [i for f, i in self._vocab.items() if df[f] > min_dense]
+        self._dense_col = np.full(len(self._vocab), -1, dtype=np.int64)
+        self._dense_col[dense_ids] = np.arange(len(dense_ids))
+        self._dense = np.zeros((n, len(dense_ids)), dtype=np.float32)
+
+        # Índice invertido (feature -> filas, peso) solo para las features no densas
+        cols: List[List[Tuple[int, float]]] = [[] for _ in self._vocab]
+        for r, d in enumerate(docs):
+            ids = np.fromiter((self._vocab[f] for f in d), dtype=np.int64, count=len(d))
+            w = np.fromiter(d.values(), dtype=np.float32, count=len(d)) * self._idf[ids]
+            w /= np.linalg.norm(w) or 1.0
+            for fid, wt in zip(ids.tolist(), w.tolist()):
+                dc = self._dense_col[fid]
+                if dc >= 0:
+                    self._dense[r, dc] = wt
+                else:
+                    cols[fid].append((r, wt))
+
+        lengths = np.fromiter((len(c) for c in cols), dtype=np.int64, count=len(cols))
+        self._col_ptr = np.concatenate(([0], np.cumsum(lengths)))
+        self._col_rows = np.fromiter((r for c in cols for r, _ in c), dtype=np.int64, count=int(lengths.sum()))
+        self._col_vals = np.fromiter((w for c in cols for _, w in c), dtype=np.float32, count=int(lengths.sum()))
+
+    @property
+    def n_features(self) -> int:
+        return len(self._vocab)
+
+    def _transform(self, descs_norm: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Ítems en formato COO (ítem, feature, peso normalizado), solo features del vocabulario.
+
+        Las features de cada palabra se calculan una sola vez (las palabras se repiten
+        mucho entre descripciones); los tf, pesos y normas salen vectorizados con numpy.
+        Las features que ninguna fila tiene reciben ids propios a partir de len(vocab).
+        """
+        vocab = self._vocab
+        n_vocab = len(vocab)
+        unseen: Dict[str, int] = {}
+        word_ids: Dict[str, np.ndarray] = {}
+
+        def _ids(word: str) -> np.ndarray:
+            ids = []
+            for f in _features(word):
+                fid = vocab.get(f)
+                if fid is None:
+                    fid = unseen.setdefault(f, n_vocab + len(unseen))
+                ids.append(fid)
+            arr = word_ids[word] = np.array(ids, dtype=np.int64)
+            return arr
+
+        parts: List[np.ndarray] = []
+        per_doc: List[int] = []
+        for desc in descs_norm:
+            size = 0
+            for word in desc.split():
+                arr = word_ids.get(word)
+                if arr is None:
+                    arr = _ids(word)
+                parts.append(arr)
+                size += len(arr)
+            per_doc.append(size)
+
+        if not parts:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0, dtype=np.float32)
+
+        n_ext = n_vocab + len(unseen)
+        feats = np.concatenate(parts)
+        docs = np.repeat(np.arange(len(descs_norm), dtype=np.int64), per_doc)
+
+        # tf por (ítem, feature): claves únicas ordenadas => salen agrupadas por ítem
+        keys, tf = np.unique(docs * n_ext + feats, return_counts=True)
+        doc_idx = keys // n_ext
+        feat_idx = keys % n_ext
+
+        idf = np.concatenate((self._idf, np.full(len(unseen), self._idf_unseen, dtype=np.float32)))
+        weights = tf.astype(np.float32) * idf[feat_idx]
+        norms = np.sqrt(np.bincount(doc_idx, weights=weights * weights, minlength=len(descs_norm)))
+        weights /= norms[doc_idx].astype(np.float32)
+
+        known = feat_idx < n_vocab
+        return doc_idx[known], feat_idx[known], weights[known]
+
+    def _score_block(self, n_docs: int, doc: np.ndarray, feat: np.ndarray, w: np.ndarray) -> np.ndarray:
+        """Scores (n_docs x filas) de un bloque de ítems ya transformados (doc relativo al bloque)."""
+        n_rows = len(self.rows)
+
+        dc = self._dense_col[feat]
+        is_dense = dc >= 0
+        x = np.zeros((n_docs, self._dense.shape[1]), dtype=np.float32)
+        x[doc[is_dense], dc[is_dense]] = w[is_dense]
+        scores = x @ self._dense.T
+
+        # Pares (ítem, fila) de las features del índice invertido
+        doc, feat, w = doc[~is_dense], feat[~is_dense], w[~is_dense]
+        starts = self._col_ptr[feat]
+        lengths = self._col_ptr[feat + 1] - starts
+        total = int(lengths.sum())
+        if total:
+            offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            pos = np.repeat(starts, lengths) + offsets
+            cells = np.repeat(doc, lengths) * n_rows + self._col_rows[pos]
+            vals = np.repeat(w, lengths) * self._col_vals[pos]
+            scores += np.bincount(cells, weights=vals, minlength=n_docs * n_rows).reshape(n_docs, n_rows)
+        return scores
+
+    def best_matches(self, descs: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (índice de la mejor fila, score) para cada descripción. Las descripciones repetidas
+        se puntúan una sola vez. Sin features en común: fila 0 con score 0.
+        """
+        n = len(descs)
+        best = np.zeros(n, dtype=np.int64)
+        score = np.zeros(n, dtype=np.float32)
+        if not n or not self.rows:
+            return best, score
+
+        unique: Dict[str, int] = {}
+        inverse = np.fromiter(
+            (unique.setdefault(norm_text(d), len(unique)) for d in descs), dtype=np.int64, count=n
+        )
+        doc, feat, w = self._transform(list(unique))
+
+        u_best = np.zeros(len(unique), dtype=np.int64)
+        u_score = np.zeros(len(unique), dtype=np.float32)
+        block = max(1, _CHUNK_CELLS // len(self.rows))
+        bounds = np.searchsorted(doc, np.arange(0, len(unique) + block, block))
+        for b, start in enumerate(range(0, len(unique), block)):
+            lo, hi = bounds[b], bounds[b + 1]
+            n_docs = min(block, len(unique) - start)
+            scores = self._score_block(n_docs, doc[lo:hi] - start, feat[lo:hi], w[lo:hi])
+            u_best[start:start + n_docs] = scores.argmax(axis=1)
+            u_score[start:start + n_docs] = scores[np.arange(n_docs), u_best[start:start + n_docs]]
+
+        np.minimum(u_score, 1.0, out=u_score)  # redondeo float32 (coseno de textos iguales)
+        return u_best[inverse], u_score[inverse]
+
+    def best_match(self, item_desc: str) -> Tuple[Optional["MatchRow"], float]:
+        """Misma interfaz que KeywordMatcher.best_match (una sola descripción)."""
+        if not self.rows:
+            return None, 0.0
+        idx, sc = self.best_matches([item_desc])
+        return self.rows[int(idx[0])], float(sc[0])
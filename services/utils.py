@@ -1,34 +1,45 @@
 from __future__ import annotations
 
-import math
-from typing import Any, Optional
+import multiprocessing
+from multiprocessing.context import BaseContext
+from typing import Any
+
+from .num_parse import parse_int
 
 
 def safe_int(v: Any, default: int = 0) -> int:
+    """
+    Entero de una celda/valor, con `default` si no es número.
+    Mismo parser que la extracción del Excel ("1.234,50" -> 1234, no 123450).
+    """
+    if isinstance(v, int):
+        return int(v)  # exacto (incluye bool), sin pasar por float
     try:
-        if v is None:
-            return default
-        if isinstance(v, bool):
-            return int(v)
-        if isinstance(v, (int,)):
-            return int(v)
-        if isinstance(v, float):
-            if math.isnan(v) or math.isinf(v):
-                return default
-            return int(round(v))
-        s = str(v).strip()
-        if not s:
-            return default
-        # quita separadores comunes
-        s = s.replace("Gs.", "").replace("Gs", "").strip()
-        s = s.replace(".", "").replace(",", "")
-        return int(s)
-    except Exception:
+        n = parse_int(v)
+    except (OverflowError, ValueError):
         return default
+    return default if n is None else n
 
 
 def format_gs(v: Any) -> str:
     n = safe_int(v, 0)
     # 1.234.567 estilo PY
     s = f"{n:,}".replace(",", ".")
-    return s
\ No newline at end of file
+    return s
+
+# Módulos que los procesos de los pools usan siempre: el forkserver los importa una vez
+_POOL_PRELOAD = ["__main__", "services.batch", "services.pdf_builder"]
+
+
+def process_pool_context() -> BaseContext:
+    """
+    Contexto para los ProcessPoolExecutor (lote y engine "parallel"): forkserver si está
+    disponible, si no spawn. Nunca fork: los pools se abren desde threads de la app
+    (JobManager) y un fork copia los locks que tengan tomados otros threads (p. ej. el de
+    MatchTableCache mientras parsea match.xlsx), así que el proceso nuevo se colgaría.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(_POOL_PRELOAD)
+        return ctx
+    return multiprocessing.get_context("spawn")